@@ -1,25 +1,27 @@
 #! /usr/bin/env python
 
 import argparse
+import io
 import sys
 import logging
 from logging import config
-import csv
 import gzip
 import shutil
 import os
 import json
 import tempfile
-import pandas as pd
-import networkx as nx
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from functools import partial
 import requests
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 from ndexutil.config import NDExUtilConfig
-from ndexutil.tsv.streamtsvloader import StreamTSVLoader
-from ndexutil.ndex import NDExExtraUtils
-from ndexutil.cytoscape import Py4CytoscapeWrapper
-from ndexutil.cytoscape import DEFAULT_CYREST_API
-import ndex2
 import ndexstringloader
 from ndexstringloader.exceptions import NDExSTRINGLoaderError
 
@@ -35,6 +37,14 @@ STYLE = 'style.cx'
 
 TSV2NICECXMODULE = 'ndexutil.tsv.tsv2nicecx2'
 
+# number of network summaries NDEx returns per request by default
+SUMMARIES_PAGE_SIZE = 1000
+
+# same value as ndexutil.cytoscape.DEFAULT_CYREST_API; that module is
+# not imported here since it pulls in ndex2 and pandas, which are only
+# needed once the loader gets to generating and uploading the network
+DEFAULT_CYREST_URL = 'http://localhost:1234/v1'
+
 LOG_FORMAT = "%(asctime)-15s %(levelname)s %(relativeCreated)dms " \
              "%(filename)s::%(funcName)s():%(lineno)d %(message)s"
 
@@ -42,6 +52,71 @@ LOG_FORMAT = "%(asctime)-15s %(levelname)s %(relativeCreated)dms " \
 STRING_LOAD_PLAN = 'string_plan.json'
 DEFAULT_ICONURL = 'https://home.ndexbio.org/img/STRING-logo.png'
 
+# network attributes used when not set on the network being updated
+DEFAULT_RIGHTS = 'Attribution 4.0 International (CC BY 4.0)'
+DEFAULT_RIGHTS_HOLDER = 'STRING CONSORTIUM'
+DEFAULT_ORGANISM = 'Homo sapiens (human)'
+DEFAULT_NETWORK_TYPE = ('interactome', 'ppi')
+DEFAULT_REFERENCE = '<p>Szklarczyk D, Morris JH, Cook H, Kuhn M, Wyder S, ' \
+                    'Simonovic M, Santos A, Doncheva NT, Roth A, Bork P, Jensen LJ, von Mering C.<br><b> ' \
+                    'The STRING database in 2017: quality-controlled protein-protein association networks, ' \
+                    'made broadly accessible.</b><br>Nucleic Acids Res. 2017 Jan; ' \
+                    '45:D362-68.<br> <a target="_blank" href="https://doi.org/10.1093/nar/gkw937">' \
+                    'DOI:10.1093/nar/gkw937</a></p>'
+
+# network description, formatted with the cutoff score of the network
+DESCRIPTION_TEMPLATE = '<br>This network contains high confidence (Score >= {cutoffscore}) ' \
+                       'human protein links with combined scores. Edge color was mapped to ' \
+                       'the combined score value using a yellow-green-purple gradient for ' \
+                       'Scores >={cutoffscore}.'
+
+WAS_GENERATED_BY = '<a href="https://github.com/ndexcontent/ndexstringloader" ' \
+                   'target="_blank">ndexstringloader ' + \
+                   str(ndexstringloader.__version__) + '</a>'
+
+# size of chunks passed to shutil.copyfileobj() when writing
+# downloaded or decompressed data
+COPY_BUFFER_SIZE = 128 * 1024
+
+# size of chunks read from a streamed HTTP response
+DOWNLOAD_CHUNK_SIZE = 1 << 20
+
+# read buffer placed in front of gzip streams so zlib
+# inflates large blocks instead of many small ones
+GZIP_READ_BUFFER_SIZE = 1 << 20
+
+# read buffer for the unzipped STRING files
+READ_BUFFER_SIZE = 1 << 20
+
+# write buffer of the output tsv file
+OUTPUT_BUFFER_SIZE = 1 << 20
+
+# columns of the output tsv file
+OUTPUT_TSV_FILE_COLUMNS = (
+    "name1",
+    "represents1",
+    "alias1",
+    "name2",
+    "represents2",
+    "alias2",
+    "neighborhood",
+    "neighborhood_transferred",
+    "fusion",
+    "cooccurence",
+    "homology",
+    "coexpression",
+    "coexpression_transferred",
+    "experiments",
+    "experiments_transferred",
+    "database",
+    "database_transferred",
+    "textmining",
+    "textmining_transferred",
+    "combined_score"
+)
+
+OUTPUT_TSV_HEADER = ('\t'.join(OUTPUT_TSV_FILE_COLUMNS) + '\n').encode('utf-8')
+
 
 class Formatter(argparse.ArgumentDefaultsHelpFormatter,
                 argparse.RawDescriptionHelpFormatter):
@@ -137,6 +212,11 @@ def _parse_arguments(desc, args):
                              'directory')
     parser.add_argument('--skipupload', action='store_true',
                         help='If set, skips upload of network to NDEx')
+    parser.add_argument('--checkduplicatescores', action='store_true',
+                        help='If set, fail if the same edge appears more '
+                             'than once with different combined scores. '
+                             'Requires more memory since the score of '
+                             'every edge is kept')
     parser.add_argument('--layoutedgecutoff', type=int, default=2000000,
                         help='Skip generating layout if '
                              'number of edges in network exceeds '
@@ -150,7 +230,7 @@ def _parse_arguments(desc, args):
                              'be used. If no Cytoscape is available, '
                              '"spring" from networkx is supported')
     parser.add_argument('--cyresturl',
-                        default=DEFAULT_CYREST_API,
+                        default=DEFAULT_CYREST_URL,
                         help='URL of CyREST API. Default value '
                              'is default for locally running Cytoscape')
     parser.add_argument('--update', help='UUID of network to update. If not set, '
@@ -190,15 +270,71 @@ def _setup_logging(args):
                               disable_existing_loggers=False)
 
 
+def _advise_sequential_read(file_obj):
+    """
+    Tells the kernel **file_obj** will be read from start to end
+    so it can read ahead more aggressively. Does nothing on
+    platforms without :py:func:`os.posix_fadvise`
+
+    :param file_obj: file opened for reading
+    :type file_obj: file object
+    :return: None
+    """
+    if hasattr(os, 'posix_fadvise'):
+        os.posix_fadvise(file_obj.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+
+
+def _encode_json(obj):
+    """
+    Encodes **obj** as UTF-8 JSON using :py:mod:`orjson` when it
+    is installed, which is several times faster on large aspects,
+    otherwise :py:func:`json.dumps`
+
+    :param obj: object to encode
+    :return: JSON
+    :rtype: bytes
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj).encode('utf-8')
+
+
+def _write_cx(network, cx_file):
+    """
+    Writes **network** to **cx_file** as CX. Each aspect is encoded
+    separately with :py:func:`_encode_json` and written out through a
+    large buffer, which is much faster than :py:func:`json.dump` on
+    the whole document and never holds more than one aspect's
+    encoded text in memory
+
+    :param network: network to write
+    :type network: :py:class:`~ndex2.nice_cx_network.NiceCXNetwork`
+    :param cx_file: path of CX file to write
+    :type cx_file: str
+    :return: None
+    """
+    with open(cx_file, 'wb', OUTPUT_BUFFER_SIZE) as f:
+        f.write(b'[')
+        for i, aspect in enumerate(network.to_cx()):
+            if i:
+                f.write(b',')
+            f.write(_encode_json(aspect))
+        f.write(b']')
+
+
 class NDExSTRINGLoader(object):
     """
     Class to load content
     """
-    def __init__(self, args,
-                 py4cyto=Py4CytoscapeWrapper(),
-                 ndexextra=NDExExtraUtils()):
+    def __init__(self, args, py4cyto=None, ndexextra=None):
         """
         :param args:
+        :param py4cyto: Cytoscape wrapper, if ``None`` a
+                        :py:class:`~ndexutil.cytoscape.Py4CytoscapeWrapper`
+                        is created
+        :param ndexextra: if ``None`` a
+                          :py:class:`~ndexutil.ndex.NDExExtraUtils` is
+                          created
         """
         self._conf_file = args.conf
         self._profile = args.profile
@@ -207,38 +343,26 @@ class NDExSTRINGLoader(object):
         self._args = args
         self._datadir = os.path.abspath(args.datadir)
         self._cutoffscore = args.cutoffscore
+        self._check_duplicate_scores = args.checkduplicatescores
         self._iconurl = args.iconurl
         self._template = None
         self._ndex = None
+        self._summary_indexes = None
+        if py4cyto is None:
+            from ndexutil.cytoscape import Py4CytoscapeWrapper
+            py4cyto = Py4CytoscapeWrapper()
+        if ndexextra is None:
+            from ndexutil.ndex import NDExExtraUtils
+            ndexextra = NDExExtraUtils()
         self._py4 = py4cyto
         self._ndexextra = ndexextra
 
+        # reuses connections for the STRING files which share a host
+        self._session = requests.Session()
+
         self._template_UUID = args.template
         self._update_UUID = args.update
 
-        self._output_tsv_file_columns = [
-            "name1",
-            "represents1",
-            "alias1",
-            "name2",
-            "represents2",
-            "alias2",
-            "neighborhood",
-            "neighborhood_transferred",
-            "fusion",
-            "cooccurence",
-            "homology",
-            "coexpression",
-            "coexpression_transferred",
-            "experiments",
-            "experiments_transferred",
-            "database",
-            "database_transferred",
-            "textmining",
-            "textmining_transferred",
-            "combined_score"
-        ]
-
         self._protein_links_url = \
             'https://stringdb-downloads.org/download/protein.links.full.v' +\
             self._string_version + '/9606.protein.links.full.v' +\
@@ -261,17 +385,87 @@ class NDExSTRINGLoader(object):
         self._output_tsv_file_path = os.path.join(self._datadir, '9606.protein.links.tsv')
         self._cx_network = os.path.join(self._datadir, '9606.protein.links.cx')
 
-        self.ensembl_ids = {}
+        # Ensembl id mappings are stored as parallel lists indexed by
+        # the row number assigned to each protein in self._ensembl_index
+        self._ensembl_index = {}
+        self._display_names = []
+        self._aliases = []
+        self._represents = []
+        # 'ensembl:' followed by the id without its taxonomy prefix
+        self._ensembl_short_ids = []
+
         self.duplicate_display_names = {}
         self.duplicate_uniprot_ids = {}
 
+    @property
+    def ensembl_ids(self):
+        """
+        Ensembl id mappings as a dict of dicts in this format:
+
+        ``{<ensembl id>: {'display_name': X, 'alias': Y, 'represents': Z}}``
+
+        This is a snapshot built from the underlying lists, changes
+        made to the returned dict are not stored
+
+        :return: Ensembl id mappings
+        :rtype: dict
+        """
+        return {ensembl_id: {'display_name': self._display_names[idx],
+                             'alias': self._aliases[idx],
+                             'represents': self._represents[idx]}
+                for ensembl_id, idx in self._ensembl_index.items()}
+
+    @ensembl_ids.setter
+    def ensembl_ids(self, ensembl_ids):
+        """
+        Replaces Ensembl id mappings with **ensembl_ids**
+
+        :param ensembl_ids: mappings in format returned by getter
+        :type ensembl_ids: dict
+        """
+        self._set_ensembl_index(ensembl_ids.keys())
+        for ensembl_id, idx in self._ensembl_index.items():
+            mapping = ensembl_ids[ensembl_id]
+            self._display_names[idx] = mapping['display_name']
+            self._aliases[idx] = mapping['alias']
+            self._represents[idx] = mapping['represents']
+
+    def _set_ensembl_index(self, ensembl_ids):
+        """
+        Assigns a row in the mapping lists to each id in **ensembl_ids**
+        and sets display name, alias and represents of each to None.
+        The ``ensembl:`` id used when a protein has no display name or
+        alias is built here once per protein
+
+        :param ensembl_ids: unique Ensembl ids
+        :type ensembl_ids: iterable
+        """
+        self._ensembl_index = {ensembl_id: idx
+                               for idx, ensembl_id in enumerate(ensembl_ids)}
+        num_ids = len(self._ensembl_index)
+        self._display_names = [None] * num_ids
+        self._aliases = [None] * num_ids
+        self._represents = [None] * num_ids
+        self._ensembl_short_ids = ['ensembl:' + ensembl_id.split('.', 1)[1]
+                                   for ensembl_id in self._ensembl_index]
+
     def _parse_config(self):
         """
         Parses config
         :return:
         """
         ncon = NDExUtilConfig(conf_file=self._conf_file)
-        con = ncon.get_config()
+        self._parse_config_from_parser(ncon.get_config())
+
+    def _parse_config_from_parser(self, con):
+        """
+        Sets NDEx user, password and server from section **self._profile**
+        of **con**
+
+        :param con: parsed configuration
+        :type con: :py:class:`configparser.ConfigParser`
+        :return:
+        """
         self._user = con.get(self._profile, NDExUtilConfig.USER)
         self._pass = con.get(self._profile, NDExUtilConfig.PASSWORD)
         self._server = con.get(self._profile, NDExUtilConfig.SERVER)
@@ -281,31 +475,89 @@ class NDExSTRINGLoader(object):
         Loads the CX network specified by self._args.style into self._template
         :return:
         """
+        import ndex2
         self._template = ndex2.\
             create_nice_cx_from_file(os.path.abspath(self._args.style))
 
-    def _download(self, url, local_file_name):
-
+    def _download(self, url, local_file_name, decompress=False):
+        """
+        Streams **url** to **local_file_name**. If **decompress** is
+        ``True`` the response is assumed to be gzipped and is decompressed
+        as it is written so no intermediate ``.gz`` file is created.
+        If the transfer or decompression fails part way, or fewer bytes
+        than the ``Content-Length`` header says are received, the partially
+        written **local_file_name** is removed so it is not picked up
+        later by ``--skipdownload``
+
+        :param url: URL to download
+        :type url: str
+        :param local_file_name: path to write data to
+        :type local_file_name: str
+        :param decompress: if True gunzip data while writing
+        :type decompress: bool
+        :return: 0 upon success, ERROR_CODE if download was incomplete,
+                 otherwise HTTP status code
+        :rtype: int
+        """
         logger.info('downloading {} to {}...'.format(url, local_file_name))
 
-        r = requests.get(url)
-        if r.status_code != 200:
-            return r.status_code
+        r = self._session.get(url, stream=True)
+        try:
+            if r.status_code != 200:
+                return r.status_code
 
-        with open(local_file_name, "wb") as code:
-            code.write(r.content)
+            try:
+                with open(local_file_name, 'wb') as code:
+                    if decompress is True:
+                        shutil.copyfileobj(gzip.GzipFile(fileobj=r.raw, mode='rb'),
+                                           code, length=COPY_BUFFER_SIZE)
+                    else:
+                        for chunk in r.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                            code.write(chunk)
+            except Exception:
+                if os.path.isfile(local_file_name):
+                    os.remove(local_file_name)
+                raise
+
+            if not self._is_download_complete(r):
+                logger.error('incomplete download of {}, '
+                             'removing {}'.format(url, local_file_name))
+                os.remove(local_file_name)
+                return ERROR_CODE
             logger.debug('downloaded {} to {}\n'.format(url, local_file_name))
+        finally:
+            r.close()
 
         return SUCCESS_CODE
 
+    def _is_download_complete(self, response):
+        """
+        Compares the number of bytes read from **response** with its
+        ``Content-Length`` header. Responses without the header or with
+        ``Content-Encoding`` set, where the header is the encoded size,
+        are assumed complete
+
+        :param response: fully read streamed response
+        :type response: :py:class:`requests.Response`
+        :return: False if fewer or more bytes than expected were read
+        :rtype: bool
+        """
+        if 'Content-Length' not in response.headers or\
+                'Content-Encoding' in response.headers:
+            return True
+        return response.raw.tell() == int(response.headers['Content-Length'])
+
     def _unzip(self, zip_file):
         local_file_name = zip_file[:-3]
 
         logger.info('unzipping and then removing {}...'.format(zip_file))
 
-        with gzip.open(zip_file, 'rb') as f_in:
-            with open(local_file_name, 'wb') as f_out:
-                shutil.copyfileobj(f_in, f_out)
+        with gzip.open(zip_file, 'rb') as gz_in:
+            with io.BufferedReader(gz_in,
+                                   buffer_size=GZIP_READ_BUFFER_SIZE) as f_in:
+                with open(local_file_name, 'wb') as f_out:
+                    shutil.copyfileobj(f_in, f_out,
+                                       length=COPY_BUFFER_SIZE)
 
         os.remove(zip_file)
         logger.debug('{} unzipped and removed\n'.format(zip_file))
@@ -313,142 +565,260 @@ class NDExSTRINGLoader(object):
 
     def _download_string_files(self):
         """
-        Parses config
-        :return:
+        Downloads the STRING files in parallel, decompressing
+        them on the fly
+        :return: SUCCESS_CODE or the status code of the first
+                 file, in order below, that failed to download
         """
-        ret_code = self._download(self._protein_links_url,
-                                  self._full_file_name + '.gz')
-        if ret_code != SUCCESS_CODE:
-            return ret_code
-
-        ret_code = self._download(self._names_file_url,
-                                  self._names_file + '.gz')
-        if ret_code != SUCCESS_CODE:
-            return ret_code
-
-        ret_code = self._download(self._entrez_ids_file_url,
-                                  self._entrez_file + '.gz')
-        if ret_code != SUCCESS_CODE:
-            return ret_code
+        downloads = [(self._protein_links_url, self._full_file_name),
+                     (self._names_file_url, self._names_file),
+                     (self._entrez_ids_file_url, self._entrez_file),
+                     (self._uniprot_ids_file_url, self._uniprot_file)]
+
+        # one thread per file; STRING asks for no more than
+        # 4 concurrent connections per host
+        with ThreadPoolExecutor(max_workers=len(downloads)) as executor:
+            futures = [executor.submit(self._download, url,
+                                       local_file_name, decompress=True)
+                       for url, local_file_name in downloads]
+            ret_codes = [future.result() for future in futures]
+
+        for ret_code in ret_codes:
+            if ret_code != SUCCESS_CODE:
+                return ret_code
 
-        return self._download(self._uniprot_ids_file_url,
-                              self._uniprot_file + '.gz')
+        return SUCCESS_CODE
 
-    def _unpack_STRING_files(self):
+    def _unzip_local_string_files(self):
         """
-        Parses config
+        Used when --skipdownload is set. Unzips, in parallel, any
+        STRING file that only exists in <datadir> in its ``.gz`` form
         :return:
         """
-        ret_code = self._unzip(self._full_file_name + '.gz')
-        if ret_code != SUCCESS_CODE:
-            return ERROR_CODE
-
-        ret_code = self._unzip(self._entrez_file + '.gz')
-        if ret_code != SUCCESS_CODE:
-            return ERROR_CODE
+        zip_files = [file_name + '.gz' for file_name in
+                     [self._full_file_name, self._entrez_file,
+                      self._names_file, self._uniprot_file]
+                     if not os.path.isfile(file_name) and
+                     os.path.isfile(file_name + '.gz')]
+        if not zip_files:
+            return SUCCESS_CODE
 
-        ret_code = self._unzip(self._names_file + '.gz')
-        if ret_code != SUCCESS_CODE:
-            return ERROR_CODE
+        # zlib releases the GIL while inflating, so one thread
+        # per file keeps more than one core busy
+        with ThreadPoolExecutor(max_workers=len(zip_files)) as executor:
+            ret_codes = list(executor.map(self._unzip, zip_files))
 
-        ret_code = self._unzip(self._uniprot_file + '.gz')
-        if ret_code != SUCCESS_CODE:
-            return ERROR_CODE
+        for ret_code in ret_codes:
+            if ret_code != SUCCESS_CODE:
+                return ERROR_CODE
 
         return SUCCESS_CODE
 
     def _get_name_rep_alias(self, ensembl_protein_id):
-        name_rep_alias = self.ensembl_ids[ensembl_protein_id]
+        """
+        Fills in defaults for the missing display name, represents and
+        alias of **ensembl_protein_id** and joins them with tabs.
+        Called once per Ensembl id by
+        :py:meth:`_get_encoded_name_rep_aliases`, not per edge
+
+        :param ensembl_protein_id: Ensembl id
+        :type ensembl_protein_id: str
+        :return: ``display_name\\trepresents\\talias``
+        :rtype: str
+        """
+        idx = self._ensembl_index[ensembl_protein_id]
         use_ensembl_id_for_represents = False
 
-        if name_rep_alias['display_name'] is None:
+        display_name = self._display_names[idx]
+        if display_name is None:
             use_ensembl_id_for_represents = True
-            name_rep_alias['display_name'] = 'ensembl:' + ensembl_protein_id.split('.')[1]
+            display_name = self._ensembl_short_ids[idx]
+            self._display_names[idx] = display_name
 
-        if name_rep_alias['represents'] is None:
+        represents = self._represents[idx]
+        if represents is None:
             if use_ensembl_id_for_represents:
-                name_rep_alias['represents'] = name_rep_alias['display_name']
+                represents = display_name
             else:
-                name_rep_alias['represents'] = 'hgnc:' + name_rep_alias['display_name']
+                represents = 'hgnc:' + display_name
+            self._represents[idx] = represents
 
-        if name_rep_alias['alias'] is None:
+        alias = self._aliases[idx]
+        if alias is None:
             if use_ensembl_id_for_represents:
-                name_rep_alias['alias'] = name_rep_alias['display_name']
+                alias = display_name
             else:
-                name_rep_alias['alias'] = name_rep_alias['represents']
-
-        ret_str = \
-            name_rep_alias['display_name'] + '\t' + \
-            name_rep_alias['represents'] + '\t' + \
-            name_rep_alias['alias']
-
-        return ret_str
+                alias = represents
+            self._aliases[idx] = alias
 
-    def check_if_edge_is_duplicate(self, edge_key_1,
-                                   edge_key_2, edges,
-                                   combined_score):
-        is_duplicate = True
+        return display_name + '\t' + represents + '\t' + alias
 
-        if edge_key_1 in edges:
-            if edges[edge_key_1] != combined_score:
-                raise ValueError('duplicate edge with different scores found')
-
-        elif edge_key_2 in edges:
-            if edges[edge_key_2] != combined_score:
-                raise ValueError('duplicate edge with different scores found')
-
-        else:
-            edges[edge_key_1] = combined_score
-            is_duplicate = False
+    def _get_encoded_name_rep_aliases(self):
+        """
+        Runs :py:meth:`_get_name_rep_alias` once for every Ensembl id
+        and encodes the results for the output tsv file
 
-        return is_duplicate
+        :return: UTF-8 encoded Ensembl id -> tuple of the index of the id
+                 in :py:attr:`_ensembl_index` and encoded
+                 ``display_name\\trepresents\\talias\\t``
+        :rtype: dict
+        """
+        encoded = {}
+        for ensembl_id, idx in self._ensembl_index.items():
+            name_rep_alias = self._get_name_rep_alias(ensembl_id) + '\t'
+            encoded[ensembl_id.encode('utf-8')] = (idx, name_rep_alias.encode('utf-8'))
+        return encoded
 
     def create_output_tsv_file(self, output_file=None, cutoffscore=None):
+        """
+        Writes edges of the links file with combined score of at least
+        **cutoffscore** to **output_file**
 
-        # generate output tsv file
-        logger.debug('Creating target {} file...'.format(output_file))
-
-        with open(output_file, 'w') as o_f:
-
-            # write header to the output tsv file
-            output_header = '\t'.join([x for x in self._output_tsv_file_columns]) + '\n'
-            o_f.write(output_header)
-
-            row_count = 1
-            dup_count = 0
-            cutoffscore_times_hundred = int(cutoffscore * 1000)
-
-            edges = {}
-
-            with open(self._full_file_name, 'r') as f_f:
-                next(f_f)
-                for line in f_f:
-                    columns_in_row = line.split(' ')
-
-                    combined_score = int(columns_in_row[-1].rstrip('\n'))
+        :param output_file: path to output tsv file
+        :type output_file: str
+        :param cutoffscore: Edge score cutoff
+        :type cutoffscore: float
+        :return: None
+        """
+        self._write_output_tsv_files([(cutoffscore, output_file)])
 
-                    if combined_score >= cutoffscore_times_hundred:
+    def create_output_tsv_files(self, cutoffscores):
+        """
+        Writes one output tsv file, named by :py:meth:`_get_output_tsv_path`,
+        for each of **cutoffscores** in a single pass over the links file
 
-                        protein1, protein2 = columns_in_row[0], columns_in_row[1]
+        :param cutoffscores: Edge score cutoffs
+        :type cutoffscores: list
+        :return: None
+        """
+        self._write_output_tsv_files([(cutoffscore,
+                                       self._get_output_tsv_path(cutoffscore=cutoffscore))
+                                      for cutoffscore in cutoffscores])
 
-                        edge_key_1 = (protein1, protein2)
-                        edge_key_2 = (protein2, protein1)
+    def _write_output_tsv_files(self, outputs):
+        """
+        Reads the links file once and writes each edge to every
+        output tsv file whose cutoff its combined score meets
 
-                        if self.check_if_edge_is_duplicate(edge_key_1, edge_key_2, edges, combined_score):
-                            dup_count += 1
-                            continue
+        :param outputs: tuples of (cutoffscore, output tsv file path)
+        :type outputs: list
+        :return: None
+        """
+        # strictest cutoff first, so an edge goes to the files from the
+        # first cutoff it meets to the end of the list
+        outputs = sorted(outputs, key=lambda output: output[0], reverse=True)
+        num_outputs = len(outputs)
+        cutoffs_times_hundred = [int(cutoffscore * 1000) for cutoffscore, _ in outputs]
+        lowest_cutoff_times_hundred = cutoffs_times_hundred[-1]
+
+        # index of the first (strictest) file an edge with the given score
+        # goes to: the number of cutoffs above the score, found with the
+        # C implemented bisect on the cutoffs in ascending order
+        ascending_cutoffs = cutoffs_times_hundred[::-1]
+
+        def get_level(combined_score):
+            return num_outputs - bisect_right(ascending_cutoffs, combined_score)
+
+        for _, output_file in outputs:
+            logger.debug('Creating target {} file...'.format(output_file))
+
+        # scores are only kept when they need to be compared. With more than
+        # one output, edges maps each edge to the level of the strictest file
+        # it was written to, as a later duplicate may meet a stricter cutoff.
+        # edges is not pre-sized: clear() on a filled set or dict
+        # frees its table, so there is no way to reserve capacity
+        check_scores = self._check_duplicate_scores is True
+        edges = {} if check_scores or num_outputs > 1 else set()
+
+        row_counts = [1] * num_outputs
+        dup_counts = [0] * num_outputs
+        batches = [[] for _ in outputs]
+
+        proteins = self._get_encoded_name_rep_aliases()
+
+        # links file is read and output files written as bytes so
+        # lines skip decoding and encoding by the text io layer
+        with ExitStack() as stack:
+            out_files = [stack.enter_context(open(output_file, 'wb',
+                                                  buffering=OUTPUT_BUFFER_SIZE))
+                         for _, output_file in outputs]
+
+            # write header to the output tsv files
+            for o_f in out_files:
+                o_f.write(OUTPUT_TSV_HEADER)
+
+            f_f = stack.enter_context(open(self._full_file_name, 'rb',
+                                           buffering=READ_BUFFER_SIZE))
+            _advise_sequential_read(f_f)
+            next(f_f)
+            # lines are read in blocks of about READ_BUFFER_SIZE bytes and
+            # filtered on the combined score, the last column, in a list
+            # comprehension since most lines are below the cutoff.
+            # int() ignores the leading space and trailing newline
+            for lines in iter(partial(f_f.readlines, READ_BUFFER_SIZE), []):
+                kept_lines = [line for line in lines
+                              if int(line[line.rfind(b' '):]) >= lowest_cutoff_times_hundred]
+
+                for line in kept_lines:
+
+                    # only the protein ids are split off; the score columns
+                    # are copied to the output as one string
+                    protein1, protein2, scores = line.split(b' ', 2)
+
+                    idx1, name_rep_alias_1 = proteins[protein1]
+                    idx2, name_rep_alias_2 = proteins[protein2]
+
+                    # edges are undirected so (A, B) and (B, A) share one
+                    # key: the indexes of both proteins packed into one int
+                    if idx1 < idx2:
+                        edge_key = idx1 << 32 | idx2
+                    else:
+                        edge_key = idx2 << 32 | idx1
+
+                    # files from first_level to end_level get this edge
+                    first_level = 0
+                    end_level = num_outputs
+                    if num_outputs > 1 or check_scores:
+                        combined_score = int(scores[scores.rfind(b' '):])
+                        if num_outputs > 1:
+                            first_level = get_level(combined_score)
+
+                        prev_value = edges.get(edge_key)
+                        if prev_value is not None:
+                            if check_scores:
+                                if prev_value != combined_score:
+                                    raise ValueError('duplicate edge with different scores found')
+                                end_level = first_level
+                            else:
+                                end_level = max(prev_value, first_level)
+                                if first_level < prev_value:
+                                    edges[edge_key] = first_level
+                            for level in range(end_level, num_outputs):
+                                dup_counts[level] += 1
+                            if first_level >= end_level:
+                                continue
+                        else:
+                            edges[edge_key] = combined_score if check_scores else first_level
 
-                        name_rep_alias_1 = self._get_name_rep_alias(protein1)
-                        name_rep_alias_2 = self._get_name_rep_alias(protein2)
+                    elif edge_key in edges:
+                        dup_counts[0] += 1
+                        continue
+                    else:
+                        edges.add(edge_key)
 
-                        tsv_string = name_rep_alias_1 + '\t' + name_rep_alias_2 + '\t' + \
-                                     '\t'.join(x for x in columns_in_row[2:])
+                    row = name_rep_alias_1 + name_rep_alias_2 + scores.replace(b' ', b'\t')
+                    for level in range(first_level, end_level):
+                        batches[level].append(row)
+                        row_counts[level] += 1
 
-                        o_f.write(tsv_string)
-                        row_count += 1
+                # rows kept from each block are written in one call per file
+                for o_f, batch in zip(out_files, batches):
+                    o_f.writelines(batch)
+                    batch.clear()
 
-        logger.debug('Created {} ({:,} lines) \n'.format(output_file, row_count))
-        logger.debug('{:,} duplicate rows detected \n'.format(dup_count))
+        for (_, output_file), row_count, dup_count in zip(outputs, row_counts, dup_counts):
+            logger.debug('Created {} ({:,} lines) \n'.format(output_file, row_count))
+            logger.debug('{:,} duplicate rows detected \n'.format(dup_count))
 
     def _check_if_data_dir_exists(self):
         data_dir_existed = True
@@ -459,61 +829,95 @@ class NDExSTRINGLoader(object):
 
         return data_dir_existed
 
-    def _get_headers_headers_of_links_file(self):
-        headers = None
-
-        with open(self._full_file_name, 'r') as f:
-            d_reader = csv.DictReader(f)
-            headers = ((d_reader.fieldnames)[0]).split()
+    def _init_ensembl_ids(self):
+        """
+        Builds :py:attr:`ensembl_ids` from the protein1 and protein2 columns
+        of the protein links file. Both columns are collected in a single
+        pass over the (space delimited) file. The file is read as bytes
+        and only the unique ids are decoded
 
-        return headers
+        :return:
+        """
+        logger.debug('Preparing a dictionary of Ensembl Ids ...')
 
-    def _init_ensembl_ids(self):
+        proteins = set()
+        add_protein = proteins.add
 
-        headers = self._get_headers_headers_of_links_file()
+        with open(self._full_file_name, 'rb', buffering=READ_BUFFER_SIZE) as f_f:
+            _advise_sequential_read(f_f)
+            next(f_f)
+            for line in f_f:
+                protein1, protein2, _ = line.split(b' ', 2)
+                add_protein(protein1)
+                add_protein(protein2)
 
-        logger.debug('Preparing a dictionary of Ensembl Ids ...')
+        self._set_ensembl_index(protein.decode('utf-8') for protein in proteins)
 
-        for i in range(2):
-            df = pd.read_csv(self._full_file_name, sep='\s+', skipinitialspace=True, usecols=[headers[i]])
-            df.sort_values(headers[i], inplace=True)
-            df.drop_duplicates(subset=headers[i], keep='first', inplace=True)
+        logger.info('Found {:,} unique Ensembl Ids in {}\n'.format(len(self._ensembl_index), self._full_file_name))
 
-            for index, row in df.iterrows():
-                self.ensembl_ids[row[headers[i]]] = {}
-                self.ensembl_ids[row[headers[i]]]['display_name'] = None
-                self.ensembl_ids[row[headers[i]]]['alias'] = None
-                self.ensembl_ids[row[headers[i]]]['represents'] = None
+    def _iter_mapping_file(self, mapping_file, skip_header=True):
+        """
+        Reads **mapping_file** line by line and yields the
+        whitespace separated columns of each line
+
+        :param mapping_file: path to STRING mapping file
+        :type mapping_file: str
+        :param skip_header: if True, first line of file is not returned
+        :type skip_header: bool
+        :return: columns of each line
+        :rtype: list
+        """
+        with open(mapping_file, 'r', buffering=READ_BUFFER_SIZE) as f:
+            if skip_header is True:
+                next(f)
+            for line in f:
+                yield line.split()
 
-        logger.info('Found {:,} unique Ensembl Ids in {}\n'.format(len(self.ensembl_ids), self._full_file_name))
+    def _add_duplicate(self, duplicates, ensembl_id, first_value, value):
+        """
+        Records that **ensembl_id** maps to **value** in addition to
+        **first_value** it was first mapped to. Each distinct value is
+        kept once, in the order found
+
+        :param duplicates: Ensembl id -> list of values it maps to
+        :type duplicates: dict
+        :param ensembl_id: Ensembl id
+        :type ensembl_id: str
+        :param first_value: value **ensembl_id** was first mapped to
+        :type first_value: str
+        :param value: another value **ensembl_id** maps to
+        :type value: str
+        :return: None
+        """
+        values = duplicates.get(ensembl_id)
+        if values is None:
+            duplicates[ensembl_id] = [first_value, value]
+        elif value not in values:
+            values.append(value)
 
     def _populate_display_names(self):
         logger.debug('Populating display names from {}...'.format(self._names_file))
         row_count = 0
+        get_index = self._ensembl_index.get
+        display_names = self._display_names
 
-        with open(self._names_file, 'r') as f:
-            next(f)
-            row1 = csv.reader(f, delimiter=' ')
-            for row in row1:
-                columns_in_row = row[0].split()
-                ensembl_id = columns_in_row[2]
-                display_name = columns_in_row[1]
+        for columns_in_row in self._iter_mapping_file(self._names_file):
+            ensembl_id = columns_in_row[2]
+            display_name = columns_in_row[1]
 
-                if ensembl_id in self.ensembl_ids:
+            idx = get_index(ensembl_id)
+            if idx is not None:
 
-                    if self.ensembl_ids[ensembl_id]['display_name'] is None:
-                        self.ensembl_ids[ensembl_id]['display_name'] = display_name
+                if display_names[idx] is None:
+                    display_names[idx] = display_name
 
-                    elif display_name != self.ensembl_ids[ensembl_id]['display_name']:
-                        # duplicate: we found entries in human.name_2_string.tsv where same Ensembl Id maps to
-                        # multiple display name.  This should never happen though
-                        if ensembl_id not in self.duplicate_display_names:
-                            self.duplicate_display_names[ensembl_id] = []
-                            self.duplicate_display_names[ensembl_id].append(self.ensembl_ids[ensembl_id]['display_name'])
+                elif display_name != display_names[idx]:
+                    # duplicate: we found entries in human.name_2_string.tsv where same Ensembl Id maps to
+                    # multiple display name.  This should never happen though
+                    self._add_duplicate(self.duplicate_display_names, ensembl_id,
+                                        display_names[idx], display_name)
 
-                            self.duplicate_display_names[ensembl_id].append(display_name)
-
-                row_count = row_count + 1;
+            row_count += 1
 
         logger.debug('Populated {:,} '
                      'display names from {}\n'.format(row_count,
@@ -522,37 +926,25 @@ class NDExSTRINGLoader(object):
     def _populate_aliases(self):
         logger.debug('Populating aliases from {}...'.format(self._entrez_file))
         row_count = 0
+        get_index = self._ensembl_index.get
+        aliases = self._aliases
 
-        with open(self._entrez_file, 'r') as f:
-            next(f)
-            row1 = csv.reader(f, delimiter=' ')
-            for row in row1:
-                columns_in_row = row[0].split()
-                ensembl_id = columns_in_row[2]
-                ncbi_gene_id = columns_in_row[1]
-
-                if ensembl_id in self.ensembl_ids:
-
-                    if self.ensembl_ids[ensembl_id]['alias'] is None:
+        for columns_in_row in self._iter_mapping_file(self._entrez_file):
+            ensembl_id = columns_in_row[2]
+            ncbi_gene_id = columns_in_row[1]
 
-                        ensembl_alias = 'ensembl:' + ensembl_id.split('.')[1]
+            idx = get_index(ensembl_id)
+            if idx is not None:
 
-                        # ncbi_gene_id can be |-separated list, for example, '246721|548644'
-                        ncbi_gene_id_split = ncbi_gene_id.split('|')
+                if aliases[idx] is None:
 
-                        ncbi_gene_id_split = ['ncbigene:' + element + '|' for element in ncbi_gene_id_split]
+                    # ncbi_gene_id can be |-separated list, for example, '246721|548644'
+                    alias_parts = ['ncbigene:' + element for element in ncbi_gene_id.split('|')]
+                    alias_parts.append(self._ensembl_short_ids[idx])
 
-                        if len(ncbi_gene_id_split) > 1:
-                            alias_string = "".join(ncbi_gene_id_split) + ensembl_alias
-                        else:
-                            alias_string = ncbi_gene_id_split[0] + ensembl_alias
-
-                        self.ensembl_ids[ensembl_id]['alias'] = alias_string
+                    aliases[idx] = '|'.join(alias_parts)
 
-                    else:
-                        pass
-
-                row_count = row_count + 1
+            row_count += 1
 
         logger.debug('Populated {:,} aliases from {}\n'.format(row_count,
                                                                self._entrez_file))
@@ -560,32 +952,56 @@ class NDExSTRINGLoader(object):
     def _populate_represents(self):
         logger.debug('Populating represents from {}...'.format(self._uniprot_file))
         row_count = 0
+        get_index = self._ensembl_index.get
+        represents = self._represents
 
-        with open(self._uniprot_file, 'r') as f:
-            row1 = csv.reader(f, delimiter=' ')
-            for row in row1:
-                columns_in_row = row[0].split()
-                ensembl_id = columns_in_row[2]
-                uniprot_id = columns_in_row[1].split('|')[0]
-
-                if ensembl_id in self.ensembl_ids:
+        # human.uniprot_2_string.tsv has no header line
+        for columns_in_row in self._iter_mapping_file(self._uniprot_file,
+                                                      skip_header=False):
+            ensembl_id = columns_in_row[2]
+            uniprot_id = columns_in_row[1].split('|')[0]
 
-                    if self.ensembl_ids[ensembl_id]['represents'] is None:
-                        self.ensembl_ids[ensembl_id]['represents'] = 'uniprot:' + uniprot_id
+            idx = get_index(ensembl_id)
+            if idx is not None:
 
-                    elif uniprot_id != self.ensembl_ids[ensembl_id]['represents']:
-                        # duplicate: we found entries in human.uniprot_2_string.tsv where same Ensembl Id maps to
-                        # multiple uniprot ids.
-                        if ensembl_id not in self.duplicate_uniprot_ids:
-                            self.duplicate_uniprot_ids[ensembl_id] = []
-                            self.duplicate_uniprot_ids[ensembl_id].append(self.ensembl_ids[ensembl_id]['represents'])
+                if represents[idx] is None:
+                    represents[idx] = 'uniprot:' + uniprot_id
 
-                            self.duplicate_uniprot_ids[ensembl_id].append('uniprot:' + uniprot_id)
+                elif 'uniprot:' + uniprot_id != represents[idx]:
+                    # duplicate: we found entries in human.uniprot_2_string.tsv where same Ensembl Id maps to
+                    # multiple uniprot ids.
+                    self._add_duplicate(self.duplicate_uniprot_ids, ensembl_id,
+                                        represents[idx], 'uniprot:' + uniprot_id)
 
-                row_count = row_count + 1;
+            row_count += 1
 
         logger.debug('Populated {:,} represents from {}\n'.format(row_count, self._uniprot_file))
 
+    def _populate_mappings(self):
+        """
+        Populates display names, aliases and represents of
+        the Ensembl ids from the three STRING mapping files.
+
+        Each file fills its own list so the files are read in
+        parallel threads. Any exception raised while reading
+        a file is re-raised here
+
+        :return: None
+        """
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            futures = [
+                # populate name - 4.display name -> becomes name
+                executor.submit(self._populate_display_names),
+
+                # populate alias - 3. node string id -> becomes alias, for example
+                # ensembl:ENSP00000000233|ncbigene:857
+                executor.submit(self._populate_aliases),
+
+                executor.submit(self._populate_represents)
+            ]
+            for future in futures:
+                future.result()
+
     def _is_valid_update_uuid(self):
         """
         Checks if self._update_UUID is valid by passing
@@ -622,24 +1038,16 @@ class NDExSTRINGLoader(object):
             ret_code = self._download_string_files()
             if ret_code != SUCCESS_CODE:
                 return ERROR_CODE
-
-            ret_code = self._unpack_STRING_files()
+        else:
+            ret_code = self._unzip_local_string_files()
             if ret_code != SUCCESS_CODE:
                 return ERROR_CODE
 
         self._init_ensembl_ids()
 
-        # populate name - 4.display name -> becomes name
-        self._populate_display_names()
-
-        # populate alias - 3. node string id -> becomes alias, for example
-        # ensembl:ENSP00000000233|ncbigene:857
-        self._populate_aliases()
+        self._populate_mappings()
 
-        self._populate_represents()
-        for cutoffscore in self._cutoffscore:
-            self.create_output_tsv_file(output_file=self._get_output_tsv_path(cutoffscore=cutoffscore),
-                                        cutoffscore=cutoffscore)
+        self.create_output_tsv_files(self._cutoffscore)
 
         return SUCCESS_CODE
 
@@ -698,6 +1106,44 @@ class NDExSTRINGLoader(object):
 
         return network_name
 
+    def _get_summary_properties(self, summary):
+        """
+        Indexes network properties of **summary** by name
+
+        :param summary: Network properties from existing network
+        :type summary: dict
+        :return: property name -> first property with that name,
+                 empty if **summary** is None
+        :rtype: dict
+        """
+        properties = {}
+        if summary is not None:
+            for prop in summary['properties']:
+                properties.setdefault(prop['predicateString'], prop)
+        return properties
+
+    def _get_property_value(self, net_property, properties, default_value):
+        """
+
+        :param net_property: Name of network property
+        :type net_property: str
+        :param properties: Network properties from existing network as
+                           returned by :py:meth:`_get_summary_properties`
+        :type properties: dict
+        :param default_value:
+        :return: new value for property
+        """
+        prop = properties.get(net_property)
+        if prop is None:
+            return default_value
+
+        if prop['dataType'] and prop['dataType'] == 'list_of_string':
+            string_value = prop['value'][1:-1]
+            string_value = string_value.replace('"', '')
+            return string_value.split(',')
+
+        return prop['value']
+
     def _get_property_from_summary(self, net_property,
                                    summary, default_value):
         """
@@ -709,74 +1155,55 @@ class NDExSTRINGLoader(object):
         :param default_value:
         :return: new value for property
         """
-        if summary is None:
-            return default_value
-
-        for prop in summary['properties']:
-            if net_property == prop['predicateString']:
-                if prop['dataType'] and prop['dataType'] == 'list_of_string':
-                    string_value = prop['value'][1:-1]
-                    string_value = string_value.replace('"', '')
-                    return string_value.split(',')
-                else:
-                    return prop['value']
-
-        return default_value
+        return self._get_property_value(net_property,
+                                        self._get_summary_properties(summary),
+                                        default_value)
 
     def _init_network_attributes(self, summary=None, cutoffscore=None):
         net_attributes = {}
 
+        # properties of summary are indexed once for all lookups below
+        properties = self._get_summary_properties(summary)
+
         net_attributes['name'] = self._get_network_name(cutoffscore=cutoffscore)
 
-        net_attributes['description'] = '<br>This network contains high confidence (Score >= ' \
-                    + str(cutoffscore) + ') human protein links with combined scores. ' \
-                    + 'Edge color was mapped to the combined score value using a yellow-green-purple gradient for Scores >=' +  str(cutoffscore) + '.'
+        net_attributes['description'] = DESCRIPTION_TEMPLATE.format(cutoffscore=cutoffscore)
 
-        rights = 'Attribution 4.0 International (CC BY 4.0)'
-        net_attributes['rights'] = self._get_property_from_summary('rights', summary, rights)
+        net_attributes['rights'] = self._get_property_value('rights', properties, DEFAULT_RIGHTS)
 
-        rights_holder = 'STRING CONSORTIUM'
-        net_attributes['rightsHolder'] = self._get_property_from_summary('rightsHolder',
-                                                                         summary,
-                                                                         rights_holder)
+        net_attributes['rightsHolder'] = self._get_property_value('rightsHolder',
+                                                                  properties,
+                                                                  DEFAULT_RIGHTS_HOLDER)
 
         net_attributes['version'] = self._string_version
 
-        organism = 'Homo sapiens (human)'
-        net_attributes['organism'] = self._get_property_from_summary('organism', summary, organism)
+        net_attributes['organism'] = self._get_property_value('organism', properties, DEFAULT_ORGANISM)
 
-        network_type = ['interactome', 'ppi']
-        net_attributes['networkType'] = self._get_property_from_summary('networkType',
-                                                                        summary,
-                                                                        network_type)
+        net_attributes['networkType'] = self._get_property_value('networkType',
+                                                                 properties,
+                                                                 list(DEFAULT_NETWORK_TYPE))
 
-        reference = '<p>Szklarczyk D, Morris JH, Cook H, Kuhn M, Wyder S, ' \
-                    + 'Simonovic M, Santos A, Doncheva NT, Roth A, Bork P, Jensen LJ, von Mering C.<br><b> ' \
-                    + 'The STRING database in 2017: quality-controlled protein-protein association networks, ' \
-                    + 'made broadly accessible.</b><br>Nucleic Acids Res. 2017 Jan; ' \
-                    + '45:D362-68.<br> <a target="_blank" href="https://doi.org/10.1093/nar/gkw937">' \
-                    + 'DOI:10.1093/nar/gkw937</a></p>'
-        net_attributes['reference'] = self._get_property_from_summary('reference', summary, reference)
+        net_attributes['reference'] = self._get_property_value('reference', properties, DEFAULT_REFERENCE)
 
         net_attributes['prov:wasDerivedFrom'] = self._protein_links_url
 
-        was_generated_by = '<a href="https://github.com/ndexcontent/ndexstringloader" ' \
-                           'target="_blank">ndexstringloader ' \
-            + str(ndexstringloader.__version__) + '</a>'
-        net_attributes['prov:wasGeneratedBy'] = was_generated_by
+        net_attributes['prov:wasGeneratedBy'] = WAS_GENERATED_BY
 
         net_attributes['__iconurl'] = self._iconurl if self._iconurl \
-            else self._get_property_from_summary('__iconurl',
-                                                 summary, self._iconurl)
+            else self._get_property_value('__iconurl',
+                                          properties, self._iconurl)
 
         return net_attributes
 
     def _generate_cx_file(self, network_attributes, tsv_file=None, cx_file=None):
 
-        logger.debug('generating CX file for network {}...'.format(network_attributes['name']))
-        with open(tsv_file, 'r') as tsvfile:
+        from ndexutil.tsv.streamtsvloader import StreamTSVLoader
+
+        logger.debug('generating CX file for network %s...',
+                     network_attributes['name'])
+        with open(tsv_file, 'r', buffering=READ_BUFFER_SIZE) as tsvfile:
 
-            with open(cx_file, "w") as out:
+            with open(cx_file, "w", buffering=OUTPUT_BUFFER_SIZE) as out:
                 loader = StreamTSVLoader(self._load_plan, self._template)
                 loader.write_cx_network(tsvfile, out,
                     [
@@ -802,11 +1229,9 @@ class NDExSTRINGLoader(object):
                     ])
                 edge_count = loader.edgeCounter
                 node_count = loader.nodeCounter
-        logger.debug('CX file for network ' +
-                     network_attributes['name'] +
-                     ' with ' + str(node_count) +
-                     ' nodes and ' + str(edge_count) +
-                     ' edges generated')
+        logger.debug('CX file for network %s with %s nodes and %s '
+                     'edges generated', network_attributes['name'],
+                     node_count, edge_count)
         return node_count, edge_count
 
     def _update_network_on_server(self, network_name, network_id=None,
@@ -823,29 +1248,26 @@ class NDExSTRINGLoader(object):
         :return: 0 upon success otherwise error
         """
         if self._args.skipupload is True:
-            logger.info('--skipupload set. Skipping upload of network ' +
-                        str(network_name))
+            logger.info('--skipupload set. Skipping upload of network %s',
+                        network_name)
             return SUCCESS_CODE
 
-        logger.info('updating network {} on server {} '
-                    'for user {}...'.format(network_name,
-                                            str(self._server),
-                                            str(self._user)))
+        logger.info('updating network %s on server %s for user %s...',
+                    network_name, self._server, self._user)
 
         with open(cx_file, 'br') as network_out:
             try:
                 resp = self._ndex.update_cx_network(network_out,
                                                     network_id)
-                logger.info('network {} updated on server {} for '
-                            'user {}\n'.format(network_name,
-                                               str(self._server),
-                                               str(self._user)))
+                logger.info('network %s updated on server %s for '
+                            'user %s\n', network_name, self._server,
+                            self._user)
                 if str(resp) != '':
                     return ERROR_CODE
                 return SUCCESS_CODE
             except Exception as e:
                 logger.exception('Caught exception attempting to '
-                                 'update network: ' + str(e))
+                                 'update network: %s', e)
                 return ERROR_CODE
 
     def _load_network_to_server(self, network_name, cx_file=None):
@@ -859,26 +1281,23 @@ class NDExSTRINGLoader(object):
         :return: 0 upon success otherwise error
         """
         if self._args.skipupload is True:
-            logger.info('--skipupload set. Skipping upload of network ' +
-                        str(network_name))
+            logger.info('--skipupload set. Skipping upload of network %s',
+                        network_name)
             return SUCCESS_CODE
 
-        logger.info('loading network {} to server {} '
-                    'for user {}...'.format(network_name,
-                                            str(self._server),
-                                            str(self._user)))
+        logger.info('loading network %s to server %s for user %s...',
+                    network_name, self._server, self._user)
 
         with open(cx_file, 'br') as network_out:
             try:
                 self._ndex.save_cx_stream_as_new_network(network_out)
-                logger.info('network {} saved on server {} for '
-                            'user {}\n'.format(network_name,
-                                               str(self._server),
-                                               str(self._user)))
+                logger.info('network %s saved on server %s for '
+                            'user %s\n', network_name, self._server,
+                            self._user)
                 return SUCCESS_CODE
             except Exception as e:
                 logger.exception('Caught exception attempting to '
-                                 'upload network: ' + str(e))
+                                 'upload network: %s', e)
                 return ERROR_CODE
 
     def set_ndex_connection(self, ndex):
@@ -899,6 +1318,7 @@ class NDExSTRINGLoader(object):
         :return:
         """
         if self._ndex is None:
+            import ndex2.client
             try:
                 self._ndex = ndex2.client.Ndex2(host=self._server,
                                                 username=self._user,
@@ -913,31 +1333,61 @@ class NDExSTRINGLoader(object):
     def get_network_summaries_from_ndex_server(self):
 
         try:
-            network_summaries = self._ndex.\
+            page = self._ndex.\
                 get_network_summaries_for_user(self._user)
+            network_summaries = list(page)
+
+            # NDEx returns at most SUMMARIES_PAGE_SIZE summaries per
+            # call, a full page means there may be more to fetch
+            while len(page) == SUMMARIES_PAGE_SIZE:
+                page = self._ndex.\
+                    get_user_network_summaries(self._user,
+                                               offset=len(network_summaries),
+                                               limit=SUMMARIES_PAGE_SIZE)
+                network_summaries.extend(page)
         except Exception as e:
             print("\n{}: {}".format(type(e).__name__, e))
             return ERROR_CODE
 
         return network_summaries
 
-    def get_network_uuid(self, network_name, network_summaries):
-
-        for summary in network_summaries:
-            network_name_1 = summary.get('name')
+    def _get_summary_indexes(self, summaries):
+        """
+        Gets dicts of **summaries** keyed by network name and by
+        network UUID. Where several summaries share a key the first
+        one is kept. The dicts are built once and reused for as long
+        as the same list of summaries is passed in
+
+        :param summaries: network summaries from NDEx
+        :type summaries: list
+        :return: (summaries by name, summaries by UUID)
+        :rtype: tuple
+        """
+        if self._summary_indexes is None or \
+                self._summary_indexes[0] is not summaries:
+            by_name = {}
+            by_uuid = {}
+            for summary in summaries:
+                name = summary.get('name')
+                if name is not None:
+                    by_name.setdefault(name, summary)
+                uuid = summary.get('externalId')
+                if uuid is not None:
+                    by_uuid.setdefault(uuid, summary)
+            self._summary_indexes = (summaries, by_name, by_uuid)
+        return self._summary_indexes[1], self._summary_indexes[2]
 
-            if network_name_1 is not None:
-                if network_name_1 == network_name:
-                    return summary.get('externalId')
+    def get_network_uuid(self, network_name, network_summaries):
 
-        return None
+        by_name, by_uuid = self._get_summary_indexes(network_summaries)
+        summary = by_name.get(network_name)
+        if summary is None:
+            return None
+        return summary.get('externalId')
 
     def get_summary_from_summaries(self, summaries, network_uuid):
-        for summary in summaries:
-            if summary['externalId'] == network_uuid:
-                return summary
-
-        return None
+        by_name, by_uuid = self._get_summary_indexes(summaries)
+        return by_uuid.get(network_uuid)
 
     def get_template_from_server(self, summaries):
         template_summary = self.get_summary_from_summaries(summaries,
@@ -949,6 +1399,7 @@ class NDExSTRINGLoader(object):
                   'user {}'.format(self._template_UUID, self._user))
             return ERROR_CODE
 
+        import ndex2
         try:
             self._template = ndex2.\
                 create_nice_cx_from_server(self._server,
@@ -976,11 +1427,10 @@ class NDExSTRINGLoader(object):
                                                         tsv_file=self._get_output_tsv_path(cutoffscore=cutoffscore))
 
         if edge_count > self._args.layoutedgecutoff:
-            logger.info('Skipping layout generation '
-                        'since layout has ' + str(edge_count) +
-                        ' edges which exceeds --layoutedgecutoff '
-                        'value of ' + str(self._args.layoutedgecutoff) +
-                        ' edges')
+            logger.info('Skipping layout generation since layout has %s '
+                        'edges which exceeds --layoutedgecutoff value '
+                        'of %s edges', edge_count,
+                        self._args.layoutedgecutoff)
             return
         if self._args.layout is not None:
             if self._args.layout == 'spring':
@@ -1023,53 +1473,66 @@ class NDExSTRINGLoader(object):
             self._load_style_template()
 
         e_codes = {}
-        for cutoffscore in self._cutoffscore:
-            network_name = self._get_network_name(cutoffscore=cutoffscore)
-            cx_file = self._get_output_cx_path(cutoffscore=cutoffscore)
-            if self._update_UUID:
-                network_summary = self.\
-                    get_summary_from_summaries(summaries,
-                                               self._update_UUID)
-
-                if network_summary is None:
-                    # warning that not found and ask if to create the network
-                    answer = None
-                    while answer not in ("y", "n"):
-                        answer = input("Network with UUID {} not found on server; "
-                                       "create a new one? "
-                                       "Enter y or n: ".format(self._update_UUID))
-                        if answer == "y":
-                            self.prepare_cx(cutoffscore=cutoffscore)
-                            e_codes[network_name] = self._load_network_to_server(network_name)
-                            break
-
-                        elif answer == "n":
-                            print('Not creating network on server: ' + str(network_name))
-                            break
+        uploads = {}
+        # CX files are generated and laid out on this thread since the
+        # layout may drive the one running Cytoscape and the update path
+        # may prompt the user. Uploads go to a single worker, so a network
+        # is sent to NDEx while the next one is being prepared
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            for cutoffscore in self._cutoffscore:
+                network_name = self._get_network_name(cutoffscore=cutoffscore)
+                cx_file = self._get_output_cx_path(cutoffscore=cutoffscore)
+                if self._update_UUID:
+                    network_summary = self.\
+                        get_summary_from_summaries(summaries,
+                                                   self._update_UUID)
+
+                    if network_summary is None:
+                        # warning that not found and ask if to create the network
+                        answer = None
+                        while answer not in ("y", "n"):
+                            answer = input("Network with UUID {} not found on server; "
+                                           "create a new one? "
+                                           "Enter y or n: ".format(self._update_UUID))
+                            if answer == "y":
+                                self.prepare_cx(cutoffscore=cutoffscore)
+                                uploads[network_name] = executor.submit(
+                                    self._load_network_to_server, network_name,
+                                    cx_file=cx_file)
+                                break
+
+                            elif answer == "n":
+                                print('Not creating network on server: ' + str(network_name))
+                                break
+
+                    else:
+                        network_id = self.get_network_uuid(network_name, summaries)
+                        if network_id == ERROR_CODE:
+                            e_codes[network_name] = ERROR_CODE
+
+                        self.prepare_cx(summaries, network_id, cutoffscore=cutoffscore)
+                        uploads[network_name] = executor.submit(
+                            self._update_network_on_server, network_name,
+                            self._update_UUID, cx_file=cx_file)
 
                 else:
+                    # update UUID not specified
                     network_id = self.get_network_uuid(network_name, summaries)
                     if network_id == ERROR_CODE:
                         e_codes[network_name] = ERROR_CODE
+                    elif network_id is None:
+                        self.prepare_cx(cutoffscore=cutoffscore)
+                        uploads[network_name] = executor.submit(
+                            self._load_network_to_server, network_name,
+                            cx_file=cx_file)
+                    else:
+                        self.prepare_cx(summaries, network_id, cutoffscore=cutoffscore)
+                        uploads[network_name] = executor.submit(
+                            self._update_network_on_server, network_name,
+                            network_id, cx_file=cx_file)
 
-                    self.prepare_cx(summaries, network_id, cutoffscore=cutoffscore)
-                    e_codes[network_name] = self._update_network_on_server(network_name,
-                                                                           self._update_UUID,
-                                                                           cx_file=cx_file)
-
-            else:
-                # update UUID not specified
-                network_id = self.get_network_uuid(network_name, summaries)
-                if network_id == ERROR_CODE:
-                    e_codes[network_name] = ERROR_CODE
-                elif network_id is None:
-                    self.prepare_cx(cutoffscore=cutoffscore)
-                    e_codes[network_name] = self._load_network_to_server(network_name,
-                                                                         cx_file=cx_file)
-                else:
-                    self.prepare_cx(summaries, network_id, cutoffscore=cutoffscore)
-                    e_codes[network_name] = self._update_network_on_server(network_name, network_id,
-                                                                           cx_file=cx_file)
+        for network_name, upload in uploads.items():
+            e_codes[network_name] = upload.result()
         return e_codes
 
     def _apply_simple_spring_layout(self, iterations=5, cx_file=None):
@@ -1086,8 +1549,11 @@ class NDExSTRINGLoader(object):
         :type iterations: int
         :return: None
         """
+        import ndex2
+        import networkx as nx
+
         network = ndex2.create_nice_cx_from_file(cx_file)
-        num_nodes = len(network.get_nodes())
+        num_nodes = len(network.nodes)
 
         logger.debug('Converting network to networkx')
         my_networkx = network.to_networkx(mode='default')
@@ -1108,8 +1574,7 @@ class NDExSTRINGLoader(object):
         network.set_opaque_aspect("cartesianLayout", cartesian_aspect)
         del my_networkx
         # write out network with layout
-        with open(cx_file, 'w') as f:
-            json.dump(network.to_cx(), f)
+        _write_cx(network, cx_file)
         del network
 
     def _cartesian(self, g):
@@ -1129,12 +1594,47 @@ class NDExSTRINGLoader(object):
                  'x': float(g.pos[n][0]),
                  'y': float(g.pos[n][1])} for n in g.pos]
 
+    def _write_node_id_annotated_cx(self, network, cx_file):
+        """
+        Writes **network** to **cx_file** with the id of each node added
+        as node attribute :py:const:`NDExExtraUtils.ORIG_NODE_ID_ATTR`,
+        which is what
+        :py:meth:`NDExExtraUtils.extract_layout_aspect_from_cx` uses to
+        map the layout from Cytoscape back to the original node ids.
+        Same output as
+        :py:meth:`NDExExtraUtils.add_node_id_as_node_attribute`, but
+        **network** is left as it was so it does not have to be
+        loaded again
+
+        :param network: network to write
+        :type network: :py:class:`~ndex2.nice_cx_network.NiceCXNetwork`
+        :param cx_file: path of CX file to write
+        :type cx_file: str
+        :return: None
+        """
+        nodeid_attr_name = self._ndexextra.ORIG_NODE_ID_ATTR
+        for node_id, node_obj in network.get_nodes():
+            network.add_node_attribute(property_of=node_id,
+                                       name=nodeid_attr_name,
+                                       values=node_id, type='long')
+        _write_cx(network, cx_file)
+
+        # the id attribute was appended last to each node
+        node_attributes = network.nodeAttributes
+        for node_id, node_obj in network.get_nodes():
+            attributes = node_attributes[node_id]
+            attributes.pop()
+            if not attributes:
+                del node_attributes[node_id]
+
     def _apply_cytoscape_layout(self, cx_file=None):
         """
         Applies Cytoscape layout on network
         :param network:
         :return:
         """
+        import ndex2
+
         try:
             self._py4.cytoscape_ping()
         except Exception as e:
@@ -1143,15 +1643,15 @@ class NDExSTRINGLoader(object):
 
         temp_dir = tempfile.mkdtemp(dir=self._datadir)
         try:
+            # cx_file is parsed once: the copy imported into Cytoscape is
+            # written from this network and the layout is added to it
+            network = ndex2.create_nice_cx_from_file(cx_file)
             annotated_cx_file = os.path.join(temp_dir, 'annotated.tmp.cx')
-
-            self._ndexextra.\
-                add_node_id_as_node_attribute(cxfile=cx_file,
-                                              outcxfile=annotated_cx_file)
+            self._write_node_id_annotated_cx(network, annotated_cx_file)
             file_size = os.path.getsize(annotated_cx_file)
 
-            logger.info('Importing network from file: ' + annotated_cx_file +
-                        ' (' + str(file_size) + ' bytes) into Cytoscape')
+            logger.info('Importing network from file: %s (%s bytes) '
+                        'into Cytoscape', annotated_cx_file, file_size)
             net_dict = self._py4.\
                 import_network_from_file(annotated_cx_file,
                                          base_url=self._args.cyresturl)
@@ -1166,9 +1666,8 @@ class NDExSTRINGLoader(object):
             os.unlink(annotated_cx_file)
             net_suid = net_dict['networks'][0]
 
-            logger.info('Applying layout ' + self._args.layout +
-                        ' on network with suid: ' +
-                        str(net_suid) + ' in Cytoscape')
+            logger.info('Applying layout %s on network with suid: %s '
+                        'in Cytoscape', self._args.layout, net_suid)
             res = self._py4.layout_network(layout_name=self._args.layout,
                                            network=net_suid,
                                            base_url=self._args.cyresturl)
@@ -1176,7 +1675,7 @@ class NDExSTRINGLoader(object):
 
             tmp_cx_file = os.path.join(temp_dir, 'tmp.cx')
 
-            logger.info('Writing cx to: ' + tmp_cx_file)
+            logger.info('Writing cx to: %s', tmp_cx_file)
             res = self._py4.export_network(filename=tmp_cx_file, type='CX',
                                            network=net_suid,
                                            base_url=self._args.cyresturl)
@@ -1186,10 +1685,8 @@ class NDExSTRINGLoader(object):
 
             layout_aspect = self._ndexextra.\
                 extract_layout_aspect_from_cx(input_cx_file=tmp_cx_file)
-            network = ndex2.create_nice_cx_from_file(cx_file)
             network.set_opaque_aspect('cartesianLayout', layout_aspect)
-            with open(cx_file, 'w') as f:
-                json.dump(network.to_cx(), f)
+            _write_cx(network, cx_file)
         finally:
             shutil.rmtree(temp_dir)
 
@@ -23,8 +23,7 @@ requirements = ['ndex2',
                 'networkx',
                 'scipy',
                 'py4cytoscape',
-                'requests',
-                'pandas']
+                'requests']
 
 setup_requirements = [ ]
 
@@ -4,6 +4,9 @@
 """Tests for `ndexstringloader` package."""
 
 import os
+import configparser
+import io
+import gzip
 import tempfile
 import shutil
 import time
@@ -25,6 +28,24 @@ from ndex2.nice_cx_network import NiceCXNetwork
 import ndex2
 
 
+def _get_scratch_dir():
+    """
+    Gets directory to create test temp directories in: the
+    NDEX_TEST_TMPDIR environment variable if set, otherwise
+    /dev/shm if it is writable so test files stay in memory,
+    otherwise None for the tempfile default
+    """
+    scratch_dir = os.environ.get('NDEX_TEST_TMPDIR')
+    if scratch_dir:
+        return scratch_dir
+    if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK):
+        return '/dev/shm'
+    return None
+
+
+SCRATCH_DIR = _get_scratch_dir()
+
+
 class Param(object):
     """
     Dummy object
@@ -42,16 +63,81 @@ class dotdict(dict):
 class TestNdexstringloader(unittest.TestCase):
     """Tests for `ndexstringloader` package."""
 
+    # some duplicate records in the same format as in STRING 9606.protein.links.full.v11.0.txt
+    DUPLICATE_RECORDS = [
+        '9606.ENSP00000238651 9606.ENSP00000364486 0 0 0 0 0 0 45 0 0 800 0 0 0 800',
+        '9606.ENSP00000268876 9606.ENSP00000216181 0 0 0 0 0 0 73 0 381 0 0 422 203 700',
+        '9606.ENSP00000242462 9606.ENSP00000276480 0 0 0 0 0 0 0 0 0 0 0 0 401 400',
+        '9606.ENSP00000364486 9606.ENSP00000238651 0 0 0 0 0 0 45 0 0 800 0 0 0 800',
+        '9606.ENSP00000276480 9606.ENSP00000242462 0 0 0 0 0 0 0 0 0 0 0 0 401 400',
+        '9606.ENSP00000216181 9606.ENSP00000268876 0 0 0 0 0 0 73 0 381 0 0 422 203 700'
+    ]
+
+    # display name, alias and represents of the proteins in the records above
+    ENSEMBL_IDS = {
+        '9606.ENSP00000216181': {
+            'display_name': 'MYH9',
+            'alias': 'ncbigene:4627|ensembl:ENSP00000216181',
+            'represents': 'uniprot:P3557'
+        },
+        '9606.ENSP00000238651': {
+            'display_name': 'ACOT2',
+            'alias': 'ncbigene:10965|ensembl:ENSP00000238651',
+            'represents': 'uniprot:P49753'
+        },
+        '9606.ENSP00000242462': {
+            'display_name': 'NEUROG3',
+            'alias': 'ncbigene:50674|ensembl:ENSP00000242462',
+            'represents': 'uniprot:Q9Y4Z2'
+        },
+        '9606.ENSP00000268876': {
+            'display_name': 'UNC45B',
+            'alias': 'ncbigene:146862|ensembl:ENSP00000268876',
+            'represents': 'uniprot:Q8IWX7'
+        },
+        '9606.ENSP00000276480': {
+            'display_name': 'ST18',
+            'alias': 'ncbigene:9705|ensembl:ENSP00000276480',
+            'represents': 'uniprot:O60284'
+        },
+        '9606.ENSP00000364486': {
+            'display_name': 'FBP2',
+            'alias': 'ncbigene:8789|ensembl:ENSP00000364486',
+            'represents': 'uniprot:O00757'
+        }
+    }
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Create one temp directory to hold the data dirs of all tests
+        and write the links file with DUPLICATE_RECORDS into it
+        """
+        cls._temp_root = tempfile.mkdtemp(dir=SCRATCH_DIR)
+
+        cls._duplicates_file = os.path.join(cls._temp_root, 'duplicates.txt')
+        # the first line is header; content does not matter
+        with open(cls._duplicates_file, 'w') as f:
+            f.write('header line\n' + '\n'.join(cls.DUPLICATE_RECORDS) + '\n')
+
+    @classmethod
+    def tearDownClass(cls):
+        """Remove temp directory created by setUpClass"""
+        shutil.rmtree(cls._temp_root)
+
     def setUp(self):
         """Set up test fixtures, if any."""
 
+        datadir = os.path.join(self._temp_root, self._testMethodName)
+        os.mkdir(datadir)
+
         self._args = {
             'conf': None,
             'profile': None,
             'loadplan': None,
             'stringversion': '12.0',
             'args': None,
-            'datadir': tempfile.mkdtemp(),
+            'datadir': datadir,
             'cutoffscore': [0.7, 0],
             'layoutedgecutoff': 1000000,
             'skipupload': False,
@@ -61,183 +147,149 @@ class TestNdexstringloader(unittest.TestCase):
         self._args = dotdict(self._args)
         self._network_name = 'Network for Junit Testing STRING Loader - delete it'
 
-    def tearDown(self):
-        """Remove temp directory created by setUp"""
-        if os.path.exists(self._args['datadir']):
-            shutil.rmtree(self._args['datadir'])
-
     #@unittest.skip("skip it  now - uncomment later")
     def test_0010_parse_config(self):
+        self._args['profile'] = 'test_conf_section'
+        con = configparser.ConfigParser()
+        con.read_string('[' + self._args['profile'] + ']\n' +
+                        NDExUtilConfig.USER + ' = aaa\n' +
+                        NDExUtilConfig.PASSWORD + ' = bbb\n' +
+                        NDExUtilConfig.SERVER + ' = dev.ndexbio.org\n')
 
-        temp_dir = self._args['datadir']
-        try:
-            p = Param()
-            self._args['profile'] = 'test_conf_section'
-            self._args['conf'] = os.path.join(temp_dir, 'temp.conf')
-
-            with open(self._args['conf'], 'w') as f:
-                f.write('[' + self._args['profile'] + ']' + '\n')
-                f.write(NDExUtilConfig.USER + ' = aaa\n')
-                f.write(NDExUtilConfig.PASSWORD + ' = bbb\n')
-                f.write(NDExUtilConfig.SERVER + ' = dev.ndexbio.org\n')
-                f.flush()
-
-            loader = NDExSTRINGLoader(self._args)
+        loader = NDExSTRINGLoader(self._args)
+        loader._parse_config_from_parser(con)
+        self.assertEqual('aaa', loader._user)
+        self.assertEqual('bbb', loader._pass)
+        self.assertEqual('dev.ndexbio.org', loader._server)
+
+        # _parse_config() reads --conf with NDExUtilConfig
+        self._args['conf'] = 'some.conf'
+        loader = NDExSTRINGLoader(self._args)
+        with patch.object(NDExUtilConfig, 'get_config',
+                          autospec=True, return_value=con) as mock_get_config:
             loader._parse_config()
-            self.assertEqual('aaa', loader._user)
-            self.assertEqual('bbb', loader._pass)
-            self.assertEqual('dev.ndexbio.org', loader._server)
-        finally:
-            shutil.rmtree(temp_dir)
+            self.assertEqual('some.conf',
+                             mock_get_config.call_args[0][0].get_config_file())
+        self.assertEqual('aaa', loader._user)
 
     def test_0020_remove_duplicate_edges(self):
 
-        # some duplicate records in the same format as in STRING 9606.protein.links.full.v11.0.txt
-        duplicate_records = [
-            '9606.ENSP00000238651 9606.ENSP00000364486 0 0 0 0 0 0 45 0 0 800 0 0 0 800',
-            '9606.ENSP00000268876 9606.ENSP00000216181 0 0 0 0 0 0 73 0 381 0 0 422 203 700',
-            '9606.ENSP00000242462 9606.ENSP00000276480 0 0 0 0 0 0 0 0 0 0 0 0 401 400',
-            '9606.ENSP00000364486 9606.ENSP00000238651 0 0 0 0 0 0 45 0 0 800 0 0 0 800',
-            '9606.ENSP00000276480 9606.ENSP00000242462 0 0 0 0 0 0 0 0 0 0 0 0 401 400',
-            '9606.ENSP00000216181 9606.ENSP00000268876 0 0 0 0 0 0 73 0 381 0 0 422 203 700'
-        ]
-        ensembl_ids = {
-            '9606.ENSP00000216181': {
-                'display_name': 'MYH9',
-                'alias': 'ncbigene:4627|ensembl:ENSP00000216181',
-                'represents': 'uniprot:P3557'
-            },
-            '9606.ENSP00000238651': {
-                'display_name': 'ACOT2',
-                'alias': 'ncbigene:10965|ensembl:ENSP00000238651',
-                'represents': 'uniprot:P49753'
-            },
-            '9606.ENSP00000242462': {
-                'display_name': 'NEUROG3',
-                'alias': 'ncbigene:50674|ensembl:ENSP00000242462',
-                'represents': 'uniprot:Q9Y4Z2'
-            },
-            '9606.ENSP00000268876': {
-                'display_name': 'UNC45B',
-                'alias': 'ncbigene:146862|ensembl:ENSP00000268876',
-                'represents': 'uniprot:Q8IWX7'
-            },
-            '9606.ENSP00000276480': {
-                'display_name': 'ST18',
-                'alias': 'ncbigene:9705|ensembl:ENSP00000276480',
-                'represents': 'uniprot:O60284'
-            },
-            '9606.ENSP00000364486': {
-                'display_name': 'FBP2',
-                'alias': 'ncbigene:8789|ensembl:ENSP00000364486',
-                'represents': 'uniprot:O00757'
-            }
-        }
-
         temp_dir = self._args['datadir']
 
-        try:
-            string_loader = NDExSTRINGLoader(self._args)
-            string_loader.__setattr__('ensembl_ids', ensembl_ids)
-
-            file_with_duplicates = os.path.join(temp_dir, string_loader._full_file_name)
+        string_loader = NDExSTRINGLoader(self._args)
+        string_loader.ensembl_ids = self.ENSEMBL_IDS
 
-            # create file with duplicate records
-            with open(file_with_duplicates, 'w') as o_f:
-                o_f.write('header line' + '\n') # the first line is header; don't care what its content in this test
-                for line in duplicate_records:
-                    o_f.write(line + '\n')
-                o_f.flush()
+        file_with_duplicates = os.path.join(temp_dir, string_loader._full_file_name)
 
-            # validate that the file with duplicate records was written fine
-            with open(file_with_duplicates, 'r') as i_f:
-                next(i_f)  # skip header
-                index = 0
-                for line in i_f:
-                    self.assertEqual(line.rstrip(), duplicate_records[index])
-                    index += 1
+        shutil.copyfile(self._duplicates_file, file_with_duplicates)
 
-            # generate tsv file without duplicates
-            string_loader.create_output_tsv_file(cutoffscore=0.7,
-                                                 output_file=string_loader._get_output_tsv_path(cutoffscore=0.7))
+        # generate tsv file without duplicates
+        string_loader.create_output_tsv_file(cutoffscore=0.7,
+                                             output_file=string_loader._get_output_tsv_path(cutoffscore=0.7))
 
 
-            # records that should be in the new file after calling create_output_tsv_file
-            unique_records = [
-               'ACOT2\tuniprot:P49753\tncbigene:10965|ensembl:ENSP00000238651\tFBP2\tuniprot:O00757\tncbigene:8789|ensembl:ENSP00000364486\t0\t0\t0\t0\t0\t0\t45\t0\t0\t800\t0\t0\t0\t800',
-               'UNC45B\tuniprot:Q8IWX7\tncbigene:146862|ensembl:ENSP00000268876\tMYH9\tuniprot:P3557\tncbigene:4627|ensembl:ENSP00000216181\t0\t0\t0\t0\t0\t0\t73\t0\t381\t0\t0\t422\t203\t700',
-               'CDC16\tuniprot:Q13042\tncbigene:8881|ensembl:ENSP00000353549\tANAPC5\tuniprot:Q9UJX4\tncbigene:51433|ensembl:ENSP00000261819\t0\t0\t0\t0\t0\t102\t90\t987\t260\t900\t0\t754\t622\t999'
-            ]
+        # records that should be in the new file after calling create_output_tsv_file
+        unique_records = [
+            'ACOT2\tuniprot:P49753\tncbigene:10965|ensembl:ENSP00000238651\tFBP2\tuniprot:O00757\tncbigene:8789|ensembl:ENSP00000364486\t0\t0\t0\t0\t0\t0\t45\t0\t0\t800\t0\t0\t0\t800',
+            'UNC45B\tuniprot:Q8IWX7\tncbigene:146862|ensembl:ENSP00000268876\tMYH9\tuniprot:P3557\tncbigene:4627|ensembl:ENSP00000216181\t0\t0\t0\t0\t0\t0\t73\t0\t381\t0\t0\t422\t203\t700'
+        ]
 
-            # open the newly-generated file and validate that all records are unique
-            with open(string_loader._get_output_tsv_path(cutoffscore=0.7), 'r') as i_f:
-                index = 0
-                next(i_f) # skip header
-                for line in i_f:
-                    self.assertEqual(line.rstrip(), unique_records[index])
-                    index += 1
-
-        finally:
-            shutil.rmtree(temp_dir)
+        # open the newly-generated file and validate that all records are unique
+        with open(string_loader._get_output_tsv_path(cutoffscore=0.7), 'r') as i_f:
+            lines = i_f.read().splitlines()[1:]  # skip header
+        self.assertEqual(unique_records, lines)
 
     def test_0030_exception_on_duplicate_edge_with_different_scores(self):
 
-        # some duplicate records in the same format as in STRING 9606.protein.links.full.v11.0.txt
-        duplicate_records = [
-            '9606.ENSP00000238651 9606.ENSP00000364486 0 0 0 0 0 0 45 0 0 800 0 0 0 800',
-            '9606.ENSP00000238651 9606.ENSP00000364486 0 0 0 0 0 0 45 0 0 800 0 0 0 801'
+        # some duplicate records in the same format as in STRING 9606.protein.links.full.v11.0.txt;
+        # each case has the same edge twice with different scores
+        cases = [
+            [
+                '9606.ENSP00000238651 9606.ENSP00000364486 0 0 0 0 0 0 45 0 0 800 0 0 0 800',
+                '9606.ENSP00000238651 9606.ENSP00000364486 0 0 0 0 0 0 45 0 0 800 0 0 0 801'
+            ],
+            [
+                '9606.ENSP00000238651 9606.ENSP00000364486 0 0 0 0 0 0 45 0 0 800 0 0 0 801',
+                '9606.ENSP00000364486 9606.ENSP00000238651 0 0 0 0 0 0 45 0 0 800 0 0 0 800'
+            ]
         ]
-        ensembl_ids = {
-            '9606.ENSP00000238651': {
-                'display_name': 'ACOT2',
-                'alias': 'ncbigene:10965|ensembl:ENSP00000238651',
-                'represents': 'uniprot:P49753'
-            },
-            '9606.ENSP00000364486': {
-                'display_name': 'FBP2',
-                'alias': 'ncbigene:8789|ensembl:ENSP00000364486',
-                'represents': 'uniprot:O00757'
-            }
-        }
-
-        for i in range(0, 2):
-            temp_dir = self._args['datadir']
 
-            try:
-                string_loader = NDExSTRINGLoader(self._args)
-                string_loader.__setattr__('ensembl_ids', ensembl_ids)
+        self._args['checkduplicatescores'] = True
 
-                file_with_duplicates = os.path.join(temp_dir, string_loader._full_file_name)
+        string_loader = NDExSTRINGLoader(self._args)
+        string_loader.ensembl_ids = self.ENSEMBL_IDS
+        file_with_duplicates = os.path.join(self._args['datadir'], string_loader._full_file_name)
 
+        for duplicate_records in cases:
+            with self.subTest(duplicate_records=duplicate_records):
                 # create file with duplicate records
+                # the first line is header; don't care what its content in this test
                 with open(file_with_duplicates, 'w') as o_f:
-                    o_f.write(
-                        'header line' + '\n')  # the first line is header; don't care what its content in this test
-                    for line in duplicate_records:
-                        o_f.write(line + '\n')
-                    o_f.flush()
-
-                # validate that the file with duplicate records was written fine
-                with open(file_with_duplicates, 'r') as i_f:
-                    next(i_f)  # skip header
-                    index = 0
-                    for line in i_f:
-                        self.assertEqual(line.rstrip(), duplicate_records[index])
-                        index += 1
+                    o_f.write('header line\n' + '\n'.join(duplicate_records) + '\n')
 
                 with self.assertRaises(ValueError):
                     string_loader.create_output_tsv_file(output_file=string_loader._get_output_tsv_path(cutoffscore=0),
                                                          cutoffscore=0)
 
-            finally:
-                shutil.rmtree(temp_dir)
-                self._args['datadir'] = tempfile.mkdtemp()
+    def test_0035_duplicate_edge_with_different_scores_not_checked(self):
+
+        duplicate_records = [
+            '9606.ENSP00000238651 9606.ENSP00000364486 0 0 0 0 0 0 45 0 0 800 0 0 0 801',
+            '9606.ENSP00000364486 9606.ENSP00000238651 0 0 0 0 0 0 45 0 0 800 0 0 0 800'
+        ]
+
+        string_loader = NDExSTRINGLoader(self._args)
+        string_loader.ensembl_ids = self.ENSEMBL_IDS
+
+        with open(string_loader._full_file_name, 'w') as o_f:
+            o_f.write('header line\n' + '\n'.join(duplicate_records) + '\n')
+
+        # without --checkduplicatescores the first edge wins
+        output_file = string_loader._get_output_tsv_path(cutoffscore=0)
+        string_loader.create_output_tsv_file(output_file=output_file, cutoffscore=0)
+
+        with open(output_file, 'r') as i_f:
+            lines = i_f.read().splitlines()
+        self.assertEqual(2, len(lines))
+        self.assertTrue(lines[1].endswith('\t801'))
+
+    def test_0037_create_output_tsv_files(self):
+
+        records = [
+            '9606.ENSP00000238651 9606.ENSP00000364486 0 0 0 0 0 0 45 0 0 800 0 0 0 500',
+            '9606.ENSP00000268876 9606.ENSP00000216181 0 0 0 0 0 0 73 0 381 0 0 422 203 700',
+            '9606.ENSP00000364486 9606.ENSP00000238651 0 0 0 0 0 0 45 0 0 800 0 0 0 800',
+            '9606.ENSP00000216181 9606.ENSP00000268876 0 0 0 0 0 0 73 0 381 0 0 422 203 700'
+        ]
+        ensembl_ids = {}
+        for ensembl_id, name in [('9606.ENSP00000216181', 'MYH9'),
+                                 ('9606.ENSP00000238651', 'ACOT2'),
+                                 ('9606.ENSP00000268876', 'UNC45B'),
+                                 ('9606.ENSP00000364486', 'FBP2')]:
+            ensembl_ids[ensembl_id] = {'display_name': name, 'alias': name, 'represents': name}
 
-                # re-init duplicates and re-rerun the teast
-                duplicate_records = [
-                    '9606.ENSP00000238651 9606.ENSP00000364486 0 0 0 0 0 0 45 0 0 800 0 0 0 801',
-                    '9606.ENSP00000364486 9606.ENSP00000238651 0 0 0 0 0 0 45 0 0 800 0 0 0 800'
-                ]
+        string_loader = NDExSTRINGLoader(self._args)
+        string_loader.ensembl_ids = ensembl_ids
+
+        with open(string_loader._full_file_name, 'w') as o_f:
+            o_f.write('header line\n')
+            for line in records:
+                o_f.write(line + '\n')
+
+        # files for all cutoffs are written in one pass; an edge whose first
+        # occurrence is below a cutoff is still written for a later duplicate
+        string_loader.create_output_tsv_files([0, 0.7])
+
+        expected = {
+            0: ['ACOT2\tACOT2\tACOT2\tFBP2\tFBP2\tFBP2\t0\t0\t0\t0\t0\t0\t45\t0\t0\t800\t0\t0\t0\t500',
+                'UNC45B\tUNC45B\tUNC45B\tMYH9\tMYH9\tMYH9\t0\t0\t0\t0\t0\t0\t73\t0\t381\t0\t0\t422\t203\t700'],
+            0.7: ['UNC45B\tUNC45B\tUNC45B\tMYH9\tMYH9\tMYH9\t0\t0\t0\t0\t0\t0\t73\t0\t381\t0\t0\t422\t203\t700',
+                  'FBP2\tFBP2\tFBP2\tACOT2\tACOT2\tACOT2\t0\t0\t0\t0\t0\t0\t45\t0\t0\t800\t0\t0\t0\t800']
+        }
+        for cutoffscore, expected_records in expected.items():
+            with open(string_loader._get_output_tsv_path(cutoffscore=cutoffscore), 'r') as i_f:
+                next(i_f)  # skip header
+                self.assertEqual(expected_records, i_f.read().splitlines())
 
     def test_0040_init_network_atributes(self):
         net_attributes = {}
@@ -289,17 +341,19 @@ class TestNdexstringloader(unittest.TestCase):
         self._args['datadir'] = '__temp_dir_for_testing__'
         absolute_path = os.path.abspath(self._args['datadir'])
 
-        if os.path.exists(absolute_path):
-            os.rmdir(absolute_path)
-
         loader = NDExSTRINGLoader(self._args)
 
         # _check_if_data_dir_exists will create dir if it doesn't exist
-        loader._check_if_data_dir_exists()
-        self.assertTrue(os.path.exists(absolute_path))
+        with patch('os.path.exists', return_value=False) as mock_exists, \
+                patch('os.makedirs') as mock_makedirs:
+            self.assertFalse(loader._check_if_data_dir_exists())
+            mock_exists.assert_called_once_with(absolute_path)
+            mock_makedirs.assert_called_once_with(absolute_path, mode=0o755)
 
-        os.rmdir(absolute_path)
-        self.assertFalse(os.path.exists(absolute_path))
+        with patch('os.path.exists', return_value=True), \
+                patch('os.makedirs') as mock_makedirs:
+            self.assertTrue(loader._check_if_data_dir_exists())
+            mock_makedirs.assert_not_called()
 
     def test_0060_get_package_dir(self):
         actual_package_dir = ndexloadstring.get_package_dir()
@@ -334,6 +388,7 @@ class TestNdexstringloader(unittest.TestCase):
         expected_args['profile'] = 'ndexstringloader'
         expected_args['skipdownload'] = False
         expected_args['skipupload'] = False
+        expected_args['checkduplicatescores'] = False
         expected_args['layoutedgecutoff'] = 2000000
         expected_args['stringversion'] = '12.0'
         expected_args['style'] = os.path.join(ndexloadstring.get_package_dir(), ndexloadstring.STYLE)
@@ -404,56 +459,57 @@ class TestNdexstringloader(unittest.TestCase):
 
         self.assertEqual(ndexloadstring.logging.INFO, logger_level_set)
 
-    def test_0110_load_style_template(self):
+    @unittest.skipUnless(hasattr(os, 'posix_fadvise'), 'posix_fadvise not available')
+    def test_0105_advise_sequential_read(self):
+        temp_file = os.path.join(self._args['datadir'], 'links.txt')
+        with open(temp_file, 'w') as f:
+            f.write('protein1 protein2 combined_score\n')
 
-        self._args.style = ndexloadstring.get_style()
+        with open(temp_file, 'rb') as f:
+            with patch('os.posix_fadvise') as mock_fadvise:
+                ndexloadstring._advise_sequential_read(f)
+                mock_fadvise.assert_called_once_with(f.fileno(), 0, 0,
+                                                     os.POSIX_FADV_SEQUENTIAL)
 
-        loader = NDExSTRINGLoader(self._args)
+    def test_0107_write_cx(self):
+        net = NiceCXNetwork()
+        for x in range(3):
+            net.create_node('node' + str(x))
+        net.create_edge(edge_source=0, edge_target=1,
+                        edge_interaction='interacts-with')
+        net.set_opaque_aspect('cartesianLayout',
+                              [{'node': 0, 'x': 1.5, 'y': -2.0}])
 
-        loader._load_style_template()
+        cx_file = os.path.join(self._args['datadir'], 'net.cx')
+        ndexloadstring._write_cx(net, cx_file)
 
-        style_template_actual = loader.__getattribute__('_template')
+        with open(cx_file, 'r') as f:
+            self.assertEqual(net.to_cx(), json.load(f))
 
-        style_template_expected = \
-            ndex2.create_nice_cx_from_file(os.path.abspath(os.path.join(ndexloadstring.get_package_dir(), 'style.cx')))
+    def test_0108_encode_json(self):
+        obj = {'cartesianLayout': [{'node': 0, 'x': 1.5, 'y': -2.0}],
+               'n': 'ENSP00000000233'}
+        self.assertEqual(obj, json.loads(ndexloadstring._encode_json(obj)))
 
-        self.assertDictEqual(style_template_actual.__dict__, style_template_expected.__dict__)
+        # without orjson installed stdlib json is used
+        with patch.object(ndexloadstring, 'orjson', None):
+            self.assertEqual(json.dumps(obj).encode('utf-8'),
+                             ndexloadstring._encode_json(obj))
 
-    def test_0120_get_headers_headers_of_links_file(self):
-        header = [
-            'protein1',
-            'protein2',
-            'neighborhood',
-            'neighborhood_transferred',
-            'fusion',
-            'cooccurence',
-            'homology',
-            'coexpression',
-            'coexpression_transferred',
-            'experiments',
-            'experiments_transferred',
-            'database',
-            'database_transferred',
-            'textmining',
-            'textmining_transferred',
-            'combined_score'
-        ]
+    def test_0110_load_style_template(self):
 
-        header_str = ' '.join(header)
+        self._args.style = ndexloadstring.get_style()
 
-        temp_dir = self._args['datadir']
-        tempfile = os.path.join(temp_dir, '__temp_link_file__.txt')
+        loader = NDExSTRINGLoader(self._args)
 
-        with open(tempfile, 'w') as f:
-            f.write(header_str + '\n')
-            f.flush()
+        loader._load_style_template()
 
-        loader = NDExSTRINGLoader(self._args)
-        loader.__setattr__('_full_file_name', tempfile)
+        style_template_actual = loader._template
 
-        header_actual = loader._get_headers_headers_of_links_file()
+        style_template_expected = \
+            ndex2.create_nice_cx_from_file(os.path.abspath(os.path.join(ndexloadstring.get_package_dir(), 'style.cx')))
 
-        self.assertEqual(header, header_actual)
+        self.assertDictEqual(style_template_actual.__dict__, style_template_expected.__dict__)
 
     def test_0130_init_ensembl_ids(self):
         header = [
@@ -513,11 +569,11 @@ class TestNdexstringloader(unittest.TestCase):
             f.flush()
 
         loader = NDExSTRINGLoader(self._args)
-        loader.__setattr__('_full_file_name', tempfile)
+        loader._full_file_name = tempfile
 
         loader._init_ensembl_ids()
 
-        ensembl_ids_actual = loader.__getattribute__(('ensembl_ids'))
+        ensembl_ids_actual = loader.ensembl_ids
 
         self.assertEqual(ensembl_ids_expected, ensembl_ids_actual)
 
@@ -611,18 +667,30 @@ class TestNdexstringloader(unittest.TestCase):
 
 
         loader = NDExSTRINGLoader(self._args)
-        loader.__setattr__('_full_file_name', temp_links_file)
-        loader.__setattr__('_names_file', temp_names_file)
+        loader._full_file_name = temp_links_file
+        loader._names_file = temp_names_file
 
         loader._init_ensembl_ids()
 
         loader._populate_display_names()
-        ensembl_ids_actual = loader.__getattribute__(('ensembl_ids'))
+        ensembl_ids_actual = loader.ensembl_ids
         self.assertEqual(ensembl_ids_expected, ensembl_ids_actual)
 
-        duplicate_names = loader.__getattribute__('duplicate_display_names')
+        duplicate_names = loader.duplicate_display_names
         self.assertEqual(duplicate_names, {'9606.ENSP00000000233': ['ARF5', 'ARF55']})
 
+    def test_0145_add_duplicate(self):
+        loader = NDExSTRINGLoader(self._args)
+        duplicates = {}
+
+        loader._add_duplicate(duplicates, '9606.ENSP00000000233', 'ARF5', 'ARF55')
+        self.assertEqual({'9606.ENSP00000000233': ['ARF5', 'ARF55']}, duplicates)
+
+        # third distinct value is added, repeated values are not
+        loader._add_duplicate(duplicates, '9606.ENSP00000000233', 'ARF5', 'ARF555')
+        loader._add_duplicate(duplicates, '9606.ENSP00000000233', 'ARF5', 'ARF55')
+        self.assertEqual({'9606.ENSP00000000233': ['ARF5', 'ARF55', 'ARF555']}, duplicates)
+
     def test_0150_populate_aliases(self):
         links_header = [
             'protein1',
@@ -712,15 +780,15 @@ class TestNdexstringloader(unittest.TestCase):
 
 
         loader = NDExSTRINGLoader(self._args)
-        loader.__setattr__('_full_file_name', temp_links_file)
-        loader.__setattr__('_entrez_file', temp_entrez_file)
+        loader._full_file_name = temp_links_file
+        loader._entrez_file = temp_entrez_file
 
         loader._init_ensembl_ids()
 
         loader._populate_aliases()
         self.maxDiff = None
-        eids = loader.__getattribute__('ensembl_ids')
-        self.assertEqual(ensembl_ids_expected, loader.__getattribute__('ensembl_ids'))
+        eids = loader.ensembl_ids
+        self.assertEqual(ensembl_ids_expected, loader.ensembl_ids)
 
     def test_0160_populate_represents(self):
         links_header = [
@@ -798,16 +866,31 @@ class TestNdexstringloader(unittest.TestCase):
 
 
         loader = NDExSTRINGLoader(self._args)
-        loader.__setattr__('_full_file_name', temp_links_file)
-        loader.__setattr__('_uniprot_file', temp_uniprot_file)
+        loader._full_file_name = temp_links_file
+        loader._uniprot_file = temp_uniprot_file
 
         loader._init_ensembl_ids()
 
         loader._populate_represents()
         self.maxDiff = None
-        self.assertEqual(ensembl_ids_expected, loader.__getattribute__('ensembl_ids'))
+        self.assertEqual(ensembl_ids_expected, loader.ensembl_ids)
+        self.assertEqual({}, loader.duplicate_uniprot_ids)
+
+        os.remove(temp_uniprot_file)
 
+        # the same Ensembl id mapping to the same Uniprot ID twice is not a duplicate
+        uniprot_content_repeated_ids = [
+            '9606\tP84085|ARF5_HUMAN\t9606.ENSP00000000233\t100.0\t374.0',
+            '9606\tP84085|ARF5_HUMAN\t9606.ENSP00000000233\t100.0\t374.0'
+        ]
+        with open(temp_uniprot_file, 'w') as f:
+            for u in uniprot_content_repeated_ids:
+                f.write(u + '\n')
 
+        loader._init_ensembl_ids()
+        loader._populate_represents()
+        self.assertEqual('uniprot:P84085', loader.ensembl_ids['9606.ENSP00000000233']['represents'])
+        self.assertEqual({}, loader.duplicate_uniprot_ids)
 
         os.remove(temp_uniprot_file)
 
@@ -826,9 +909,39 @@ class TestNdexstringloader(unittest.TestCase):
 
         loader._init_ensembl_ids()
         loader._populate_represents()
-        duplicate_uniprot_ids = loader.__getattribute__('duplicate_uniprot_ids')
+        duplicate_uniprot_ids = loader.duplicate_uniprot_ids
         self.assertEqual({'9606.ENSP00000000233': ['uniprot:P84085', 'uniprot:O43307']}, duplicate_uniprot_ids)
 
+    def test_0165_iter_mapping_file(self):
+        string_loader = NDExSTRINGLoader(self._args)
+
+        mapping_file = os.path.join(self._args['datadir'], 'mapping.tsv')
+        with open(mapping_file, 'w') as o_f:
+            o_f.write('#species\tuniprot_ac|uniprot_id\tstring_id\n')
+            o_f.write('9606\tP84085|ARF5_HUMAN\t9606.ENSP00000000233\t100.0\t449.0\n')
+
+        rows = list(string_loader._iter_mapping_file(mapping_file))
+        self.assertEqual([['9606', 'P84085|ARF5_HUMAN', '9606.ENSP00000000233', '100.0', '449.0']], rows)
+
+        rows = list(string_loader._iter_mapping_file(mapping_file, skip_header=False))
+        self.assertEqual(2, len(rows))
+        self.assertEqual(['#species', 'uniprot_ac|uniprot_id', 'string_id'], rows[0])
+
+    def test_0168_populate_mappings(self):
+        string_loader = NDExSTRINGLoader(self._args)
+        string_loader._populate_display_names = MagicMock()
+        string_loader._populate_aliases = MagicMock()
+        string_loader._populate_represents = MagicMock()
+
+        string_loader._populate_mappings()
+        string_loader._populate_display_names.assert_called_once_with()
+        string_loader._populate_aliases.assert_called_once_with()
+        string_loader._populate_represents.assert_called_once_with()
+
+        string_loader._populate_aliases = MagicMock(side_effect=IOError('error'))
+        with self.assertRaises(IOError):
+            string_loader._populate_mappings()
+
     def test_0170_get_name_rep_alias(self):
 
         ensembl_ids = {
@@ -874,12 +987,22 @@ class TestNdexstringloader(unittest.TestCase):
         }
 
         string_loader = NDExSTRINGLoader(self._args)
-        string_loader.__setattr__('ensembl_ids', ensembl_ids)
+        string_loader.ensembl_ids = ensembl_ids
 
         for key, value in ensembl_ids.items():
             name_rep_alias = string_loader._get_name_rep_alias(key)
             self.assertEqual(name_rep_alias, represents_expected[key])
 
+        # defaults filled in by the first call give the same result
+        for key, value in represents_expected.items():
+            self.assertEqual(string_loader._get_name_rep_alias(key), value)
+
+        encoded = string_loader._get_encoded_name_rep_aliases()
+        self.assertEqual(len(represents_expected), len(encoded))
+        for key, value in represents_expected.items():
+            self.assertEqual((string_loader._ensembl_index[key], (value + '\t').encode()),
+                             encoded[key.encode()])
+
     def test_0180_create_NDEx_connection(self):
         loader = NDExSTRINGLoader(self._args)
 
@@ -887,12 +1010,12 @@ class TestNdexstringloader(unittest.TestCase):
         password = 'aaa'
         server = 'dev.ndexbio.org'
 
-        loader.__setattr__('_pass', password)
-        loader.__setattr__('_server', server)
+        loader._pass = password
+        loader._server = server
         ndex_client = loader.create_ndex_connection()
         self.assertIsNone(ndex_client)
 
-        loader.__setattr__('_user', 'aaa')
+        loader._user = 'aaa'
         ndex_client = loader.create_ndex_connection()
         self.assertIsNotNone(ndex_client)
 
@@ -947,9 +1070,9 @@ class TestNdexstringloader(unittest.TestCase):
         self._args.style = ndexloadstring.get_style()
         loader = NDExSTRINGLoader(self._args)
 
-        loader.__setattr__('_output_tsv_file_path', temp_links_tsv_file)
-        loader.__setattr__('_cx_network', temp_cx_network)
-        loader.__setattr__('_load_plan', ndexloadstring.get_load_plan())
+        loader._output_tsv_file_path = temp_links_tsv_file
+        loader._cx_network = temp_cx_network
+        loader._load_plan = ndexloadstring.get_load_plan()
         loader._load_style_template()
 
 
@@ -974,9 +1097,9 @@ class TestNdexstringloader(unittest.TestCase):
 
     def test_0200_load_network_to_server_cx_network_is_none(self):
         loader = NDExSTRINGLoader(self._args)
-        loader.__setattr__('_user', 'u')
-        loader.__setattr__('_pass', 'p')
-        loader.__setattr__('_server', 's')
+        loader._user = 'u'
+        loader._pass = 'p'
+        loader._server = 's'
         try:
             res = loader._load_network_to_server('ha', cx_file=loader._cx_network)
             self.assertEqual(2, res)
@@ -992,10 +1115,10 @@ class TestNdexstringloader(unittest.TestCase):
         mockndex = MagicMock()
         mockndex.save_cx_stream_as_new_network = MagicMock()
         loader.set_ndex_connection(mockndex)
-        loader.__setattr__('_user', 'u')
-        loader.__setattr__('_pass', 'p')
-        loader.__setattr__('_server', 's')
-        loader.__setattr__('_cx_network', cxfile)
+        loader._user = 'u'
+        loader._pass = 'p'
+        loader._server = 's'
+        loader._cx_network = cxfile
         res = loader._load_network_to_server('ha', cx_file=cxfile)
         self.assertEqual(0, res)
         mockndex.save_cx_stream_as_new_network.assert_called()
@@ -1008,10 +1131,10 @@ class TestNdexstringloader(unittest.TestCase):
         mockndex = MagicMock()
         mockndex.save_cx_stream_as_new_network = MagicMock(side_effect=Exception())
         loader.set_ndex_connection(mockndex)
-        loader.__setattr__('_user', 'u')
-        loader.__setattr__('_pass', 'p')
-        loader.__setattr__('_server', 's')
-        loader.__setattr__('_cx_network', cxfile)
+        loader._user = 'u'
+        loader._pass = 'p'
+        loader._server = 's'
+        loader._cx_network = cxfile
         res = loader._load_network_to_server('ha', cx_file=cxfile)
         self.assertEqual(2, res)
         mockndex.save_cx_stream_as_new_network.assert_called()
@@ -1025,10 +1148,10 @@ class TestNdexstringloader(unittest.TestCase):
         mockndex.update_cx_network = MagicMock()
         mockndex.update_cx_network.return_value = ''
         loader.set_ndex_connection(mockndex)
-        loader.__setattr__('_user', 'u')
-        loader.__setattr__('_pass', 'p')
-        loader.__setattr__('_server', 's')
-        loader.__setattr__('_cx_network', cxfile)
+        loader._user = 'u'
+        loader._pass = 'p'
+        loader._server = 's'
+        loader._cx_network = cxfile
         res = loader._update_network_on_server('haha', network_id='hehe', cx_file=cxfile)
         self.assertEqual(0, res)
         mockndex.update_cx_network.assert_called()
@@ -1056,9 +1179,9 @@ class TestNdexstringloader(unittest.TestCase):
 
         loader.set_ndex_connection(mockndex)
 
-        loader.__setattr__('_user', 'u')
-        loader.__setattr__('_pass', 'p')
-        loader.__setattr__('_server', 's')
+        loader._user = 'u'
+        loader._pass = 'p'
+        loader._server = 's'
 
         # test scenario where Network Name is found in network summaries
         for summary in network_summaries_for_mock:
@@ -1066,13 +1189,13 @@ class TestNdexstringloader(unittest.TestCase):
             network_uuid = summary.get('externalId')
             network_uuid_from_server = loader.get_network_uuid(network_name, network_summaries_for_mock)
 
-            # mockndex.get_network_summaries_for_user.assert_called_with(loader.__getattribute__('_user'))
+            # mockndex.get_network_summaries_for_user.assert_called_with(loader._user)
             self.assertEqual(network_uuid,network_uuid_from_server)
 
         # test scenario where Network Name is not found in network summaries
         network_name = 'Non Existant Name'
         network_uuid_from_server = loader.get_network_uuid(network_name, network_summaries_for_mock)
-        # mockndex.get_network_summaries_for_user.assert_called_with(loader.__getattribute__('_user'))
+        # mockndex.get_network_summaries_for_user.assert_called_with(loader._user)
         self.assertIsNone(network_uuid_from_server)
 
         # test scenario where Network Name is not found in network summaries
@@ -1092,111 +1215,168 @@ class TestNdexstringloader(unittest.TestCase):
         loader = NDExSTRINGLoader(self._args)
 
         # expect to raise Timeout exception
-        with patch('ndexstringloader.ndexloadstring.requests') as mock_requests:
-            mock_requests.get.side_effect = Timeout
+        with patch.object(loader, '_session') as mock_session:
+            mock_session.get.side_effect = Timeout
             with self.assertRaises(Timeout):
                 loader._download(entrez_url, local_downloaded_file_name_zipped)
-            mock_requests.get.assert_called_once_with(entrez_url)
+            mock_session.get.assert_called_once_with(entrez_url, stream=True)
 
-        with patch('ndexstringloader.ndexloadstring.requests.get') as mock_get:
+        with patch.object(loader, '_session') as mock_session:
             not_found_code = 404
-            mock_get.return_value.status_code = not_found_code
+            mock_session.get.return_value.status_code = not_found_code
             assert loader._download(entrez_url, local_downloaded_file_name_zipped) == not_found_code
 
-            mock_get.assert_called_once_with(entrez_url)
+            mock_session.get.assert_called_once_with(entrez_url, stream=True)
 
-        with patch('ndexstringloader.ndexloadstring.requests.get') as mock_get:
-            mock_get.return_value.status_code = 200
-            mock_get.return_value.content = 'hello'.encode()  # this is the 'content' to be written to file
+        with patch.object(loader, '_session') as mock_session:
+            mock_session.get.return_value.status_code = 200
+            mock_session.get.return_value.iter_content.return_value = ['hel'.encode(), 'lo'.encode()]  # this is the 'content' to be written to file
 
             assert loader._download(entrez_url, local_downloaded_file_name_zipped) == 0
-            mock_get.assert_called_once_with(entrez_url)
+            mock_session.get.assert_called_once_with(entrez_url, stream=True)
+            mock_session.get.return_value.iter_content.assert_called_once_with(
+                chunk_size=ndexloadstring.DOWNLOAD_CHUNK_SIZE)
+            mock_session.get.return_value.close.assert_called_once()
+            with open(local_downloaded_file_name_zipped, 'rb') as f:
+                self.assertEqual(b'hello', f.read())
+
+        # gzipped content is decompressed as it is written to file
+        with patch.object(loader, '_session') as mock_session:
+            mock_session.get.return_value.status_code = 200
+            mock_session.get.return_value.raw = io.BytesIO(gzip.compress('hello'.encode()))
+
+            assert loader._download(entrez_url, local_downloaded_file_name_unzipped,
+                                    decompress=True) == 0
+            with open(local_downloaded_file_name_unzipped, 'rb') as f:
+                self.assertEqual(b'hello', f.read())
+
+        # truncated gzipped content raises and leaves no partial file behind
+        with patch.object(loader, '_session') as mock_session:
+            mock_session.get.return_value.status_code = 200
+            mock_session.get.return_value.raw = io.BytesIO(gzip.compress('hello'.encode())[:-4])
+
+            with self.assertRaises(EOFError):
+                loader._download(entrez_url, local_downloaded_file_name_unzipped,
+                                 decompress=True)
+            self.assertFalse(os.path.exists(local_downloaded_file_name_unzipped))
+            mock_session.get.return_value.close.assert_called_once()
+
+    def test_0255_is_download_complete(self):
+        loader = NDExSTRINGLoader(self._args)
+
+        response = MagicMock()
+        response.raw.tell.return_value = 5
+
+        response.headers = {}
+        self.assertTrue(loader._is_download_complete(response))
+
+        response.headers = {'Content-Length': '5'}
+        self.assertTrue(loader._is_download_complete(response))
+
+        response.headers = {'Content-Length': '10'}
+        self.assertFalse(loader._is_download_complete(response))
+
+        # Content-Length is the size of the encoded body
+        response.headers = {'Content-Length': '10', 'Content-Encoding': 'gzip'}
+        self.assertTrue(loader._is_download_complete(response))
+
+        # incomplete download is removed
+        local_file_name = os.path.join(self._args['datadir'], 'entrez.tsv')
+        with patch.object(loader, '_session') as mock_session:
+            mock_session.get.return_value.status_code = 200
+            mock_session.get.return_value.iter_content.return_value = [b'hello']
+            mock_session.get.return_value.headers = {'Content-Length': '10'}
+            mock_session.get.return_value.raw.tell.return_value = 5
+
+            self.assertEqual(ndexloadstring.ERROR_CODE,
+                             loader._download('https://foo', local_file_name))
+            self.assertFalse(os.path.exists(local_file_name))
 
     def test_0260_download_STRING_files(self):
 
         loader = NDExSTRINGLoader(self._args)
 
-        _protein_links_url = loader.__getattribute__('_protein_links_url')
-        _names_file_url = loader.__getattribute__('_names_file_url')
-        _entrez_ids_file_url = loader.__getattribute__('_entrez_ids_file_url')
-        _uniprot_file = loader.__getattribute__('_uniprot_ids_file_url')
+        _protein_links_url = loader._protein_links_url
+        _names_file_url = loader._names_file_url
+        _entrez_ids_file_url = loader._entrez_ids_file_url
+        _uniprot_file = loader._uniprot_ids_file_url
 
         not_found_code = 404
 
         with requests_mock.mock() as m:
             # test scenario when all fiels are downloaded fine
-            m.get(_protein_links_url, text='protein data returned by the get', status_code=200)
-            m.get(_names_file_url, text='name data returned by the get', status_code=200)
-            m.get(_entrez_ids_file_url, text='entrez data returned by the get', status_code=200)
-            m.get(_uniprot_file, text='uniprot data returned by the get', status_code=200)
+            m.get(_protein_links_url, content=gzip.compress(b'protein data returned by the get'), status_code=200)
+            m.get(_names_file_url, content=gzip.compress(b'name data returned by the get'), status_code=200)
+            m.get(_entrez_ids_file_url, content=gzip.compress(b'entrez data returned by the get'), status_code=200)
+            m.get(_uniprot_file, content=gzip.compress(b'uniprot data returned by the get'), status_code=200)
             assert loader._download_string_files() == 0
+            with open(loader._full_file_name, 'r') as f:
+                self.assertEqual('protein data returned by the get', f.read())
 
             # test scenario when failed to download _protein_links_url
-            m.get(_protein_links_url, text='data returned by the get', status_code=not_found_code)
+            m.get(_protein_links_url, content=gzip.compress(b'data returned by the get'), status_code=not_found_code)
             assert loader._download_string_files() == not_found_code
 
             # test scenario when failed to download _names_file_url
-            m.get(_protein_links_url, text='data returned by the get', status_code=200)
-            m.get(_names_file_url, text='name data returned by the get', status_code=not_found_code)
+            m.get(_protein_links_url, content=gzip.compress(b'data returned by the get'), status_code=200)
+            m.get(_names_file_url, content=gzip.compress(b'name data returned by the get'), status_code=not_found_code)
             assert loader._download_string_files() == not_found_code
 
             # test scenario when failed to download _entrez_ids_file_url
-            m.get(_protein_links_url, text='protein data returned by the get', status_code=200)
-            m.get(_names_file_url, text='name data returned by the get', status_code=200)
-            m.get(_entrez_ids_file_url, text='entrez data returned by the get', status_code=not_found_code)
+            m.get(_protein_links_url, content=gzip.compress(b'protein data returned by the get'), status_code=200)
+            m.get(_names_file_url, content=gzip.compress(b'name data returned by the get'), status_code=200)
+            m.get(_entrez_ids_file_url, content=gzip.compress(b'entrez data returned by the get'), status_code=not_found_code)
             assert loader._download_string_files() == not_found_code
 
             # test scenario when failed to download _uniprot_file
-            m.get(_protein_links_url, text='protein data returned by the get', status_code=200)
-            m.get(_names_file_url, text='name data returned by the get', status_code=200)
-            m.get(_entrez_ids_file_url, text='entrez data returned by the get', status_code=200)
-            m.get(_uniprot_file, text='uniprot data returned by the get', status_code=not_found_code)
+            m.get(_protein_links_url, content=gzip.compress(b'protein data returned by the get'), status_code=200)
+            m.get(_names_file_url, content=gzip.compress(b'name data returned by the get'), status_code=200)
+            m.get(_entrez_ids_file_url, content=gzip.compress(b'entrez data returned by the get'), status_code=200)
+            m.get(_uniprot_file, content=gzip.compress(b'uniprot data returned by the get'), status_code=not_found_code)
             assert loader._download_string_files() == not_found_code
 
-    def test_0270_unpack_STRING_files(self):
-
-        loader = NDExSTRINGLoader(self._args)
-        vals = {
-            ('full.gz'): ndexloadstring.ERROR_CODE,
-            ('entrez.gz'): ndexloadstring.ERROR_CODE,
-            ('names.gz'): ndexloadstring.ERROR_CODE,
-            ('uniprot.gz'): ndexloadstring.ERROR_CODE
-        }
-
-        def side_effect(args):
-            ret_value = vals[args]
-            return ret_value
+            # all four files are requested even if one fails; the code of
+            # the first failed file in download order is returned
+            m.reset_mock()
+            m.get(_names_file_url, content=gzip.compress(b'name data returned by the get'), status_code=500)
+            assert loader._download_string_files() == 500
+            self.assertEqual(4, m.call_count)
 
-        loader._unzip = MagicMock(return_value = 0)
+    def test_0270_unzip_local_STRING_files(self):
 
-        loader.__setattr__('_full_file_name', 'full')
-        loader.__setattr__('_entrez_file', 'entrez')
-        loader.__setattr__('_names_file', 'names')
-        loader.__setattr__('_uniprot_file', 'uniprot')
-
-        ret_value = loader._unpack_STRING_files()
-        self.assertEqual(ret_value, 0)
-
-        loader._unzip = MagicMock(side_effect=side_effect)
-        ret_value = loader._unpack_STRING_files()
-        self.assertEqual(ret_value, ndexloadstring.ERROR_CODE)
-
-        # now, I want simulate a scenario where unzipping full.gz succeeds, but unzipping entrez.gz fails
-        vals[('full.gz')] = ndexloadstring.SUCCESS_CODE
-        ret_value = loader._unpack_STRING_files()
-        self.assertEqual(ret_value, ndexloadstring.ERROR_CODE)
-
-        vals[('entrez.gz')] = ndexloadstring.SUCCESS_CODE
-        ret_value = loader._unpack_STRING_files()
-        self.assertEqual(ret_value, ndexloadstring.ERROR_CODE)
-
-        vals[('names.gz')] = ndexloadstring.SUCCESS_CODE
-        ret_value = loader._unpack_STRING_files()
-        self.assertEqual(ret_value, ndexloadstring.ERROR_CODE)
+        loader = NDExSTRINGLoader(self._args)
+        temp_dir = self._args['datadir']
 
-        vals[('uniprot.gz')] = ndexloadstring.SUCCESS_CODE
-        ret_value = loader._unpack_STRING_files()
-        self.assertEqual(ret_value, ndexloadstring.SUCCESS_CODE)
+        loader._full_file_name = os.path.join(temp_dir, 'full')
+        loader._entrez_file = os.path.join(temp_dir, 'entrez')
+        loader._names_file = os.path.join(temp_dir, 'names')
+        loader._uniprot_file = os.path.join(temp_dir, 'uniprot')
+
+        # nothing to unzip
+        loader._unzip = MagicMock(return_value=ndexloadstring.SUCCESS_CODE)
+        self.assertEqual(loader._unzip_local_string_files(), ndexloadstring.SUCCESS_CODE)
+        loader._unzip.assert_not_called()
+
+        # only files with just a .gz version on disk are unzipped
+        with open(os.path.join(temp_dir, 'full.gz'), 'w') as f:
+            f.write('full')
+        with open(os.path.join(temp_dir, 'names.gz'), 'w') as f:
+            f.write('names')
+        with open(os.path.join(temp_dir, 'names'), 'w') as f:
+            f.write('names')
+        self.assertEqual(loader._unzip_local_string_files(), ndexloadstring.SUCCESS_CODE)
+        loader._unzip.assert_called_once_with(os.path.join(temp_dir, 'full.gz'))
+
+        loader._unzip = MagicMock(return_value=ndexloadstring.ERROR_CODE)
+        self.assertEqual(loader._unzip_local_string_files(), ndexloadstring.ERROR_CODE)
+
+        # every file is unzipped, and any failure is reported
+        with open(os.path.join(temp_dir, 'uniprot.gz'), 'w') as f:
+            f.write('uniprot')
+        loader._unzip = MagicMock(side_effect=[ndexloadstring.SUCCESS_CODE,
+                                               ndexloadstring.ERROR_CODE])
+        self.assertEqual(loader._unzip_local_string_files(), ndexloadstring.ERROR_CODE)
+        self.assertEqual(loader._unzip.call_count, 2)
 
     @mock.patch('ndexstringloader.ndexloadstring.gzip.open')
     @mock.patch('ndexstringloader.ndexloadstring.open')
@@ -1206,9 +1386,11 @@ class TestNdexstringloader(unittest.TestCase):
 
         loader = NDExSTRINGLoader(self._args)
 
-        full_file_name = loader.__getattribute__('_full_file_name')
+        full_file_name = loader._full_file_name
         full_file_name_gz = full_file_name + '.gz'
 
+        mock_gzopen.return_value = io.BytesIO(b'')
+
         ret_value = loader._unzip(full_file_name_gz)
         self.assertEqual(ret_value, 0)
 
@@ -1225,18 +1407,20 @@ class TestNdexstringloader(unittest.TestCase):
         # will just make sure it was called ...
         # mock_copyfileobj.assert_called_with(mock_gzopen, mock_open)
         mock_copyfileobj.assert_called_once()
+        self.assertEqual(ndexloadstring.COPY_BUFFER_SIZE,
+                         mock_copyfileobj.call_args[1]['length'])
 
     def test_0290_is_valid_update_UUID(self):
 
         loader = NDExSTRINGLoader(self._args)
 
-        loader.__setattr__('_update_UUID', None)
+        loader._update_UUID = None
         self.assertTrue(loader._is_valid_update_uuid())
 
-        loader.__setattr__('_update_UUID', 'a62c9252-ce13-11e9-8bd8-525400c25d22')
+        loader._update_UUID = 'a62c9252-ce13-11e9-8bd8-525400c25d22'
         self.assertTrue(loader._is_valid_update_uuid())
 
-        loader.__setattr__('_update_UUID', 'a62c9252-ce13-11e9-8bd8-525400c25d2')
+        loader._update_UUID = 'a62c9252-ce13-11e9-8bd8-525400c25d2'
         self.assertFalse(loader._is_valid_update_uuid())
 
     def test_0300_get_network_name(self):
@@ -1260,6 +1444,28 @@ class TestNdexstringloader(unittest.TestCase):
         network_name = 'STRING v12.0: Human Protein Links - High Confidence (Score >= 0.543)'
         self.assertEqual(network_name, loader._get_network_name(cutoffscore=0.543))
 
+    def test_0245_get_summary_indexes(self):
+        loader = NDExSTRINGLoader(self._args)
+        summaries = [
+            {'name': 'Network 1', 'externalId': '111-111-111'},
+            {'externalId': '222-222-222'},
+            {'name': 'Network 1', 'externalId': '333-333-333'}
+        ]
+        by_name, by_uuid = loader._get_summary_indexes(summaries)
+        self.assertEqual({'Network 1': summaries[0]}, by_name)
+        self.assertEqual({'111-111-111': summaries[0],
+                          '222-222-222': summaries[1],
+                          '333-333-333': summaries[2]}, by_uuid)
+
+        # same list, indexes are reused
+        self.assertIs(by_name, loader._get_summary_indexes(summaries)[0])
+
+        # different list, indexes are rebuilt
+        other = [{'name': 'Network 2', 'externalId': '444-444-444'}]
+        self.assertEqual('444-444-444',
+                         loader.get_network_uuid('Network 2', other))
+        self.assertIsNone(loader.get_network_uuid('Network 1', other))
+
     def test_0310_get_summary_from_summaries(self):
         loader = NDExSTRINGLoader(self._args)
 
@@ -1390,9 +1596,9 @@ class TestNdexstringloader(unittest.TestCase):
         mockndex.get_network_summaries_for_user = MagicMock(return_value=network_summaries)
         loader.set_ndex_connection(mockndex)
         user = 'AAA BBB'
-        loader.__setattr__('_user', user)
-        loader.__setattr__('_pass', 'pass')
-        loader.__setattr__('_server', 'server')
+        loader._user = user
+        loader._pass = 'pass'
+        loader._server = 'server'
         received_summaries = loader.get_network_summaries_from_ndex_server()
         self.assertEqual(network_summaries, received_summaries)
         mockndex.get_network_summaries_for_user.assert_called_with(user)
@@ -1418,9 +1624,9 @@ class TestNdexstringloader(unittest.TestCase):
         mockndex.get_network_summaries_for_user = MagicMock(return_value=network_summaries)
         loader.set_ndex_connection(mockndex)
         user = 'AAA BBB'
-        loader.__setattr__('_user', user)
-        loader.__setattr__('_pass', 'pass')
-        loader.__setattr__('_server', 'server')
+        loader._user = user
+        loader._pass = 'pass'
+        loader._server = 'server'
         received_summaries = loader.get_network_summaries_from_ndex_server()
         self.assertEqual(network_summaries, received_summaries)
         mockndex.get_network_summaries_for_user.assert_called_with(user)
@@ -1433,6 +1639,28 @@ class TestNdexstringloader(unittest.TestCase):
         self.assertEqual(mockndex.get_network_summaries_for_user.call_count, 2)
         self.assertEqual(ndexloadstring.ERROR_CODE, status)
 
+    def test_0345_get_network_summaries_from_NDEx_server_pages(self):
+        loader = NDExSTRINGLoader(self._args)
+        page_size = ndexloadstring.SUMMARIES_PAGE_SIZE
+        first_page = [{'name': 'Network ' + str(x)} for x in range(page_size)]
+        second_page = [{'name': 'Network ' + str(x + page_size)}
+                       for x in range(page_size)]
+        last_page = [{'name': 'Last network'}]
+
+        mockndex = MagicMock()
+        mockndex.get_network_summaries_for_user = MagicMock(return_value=first_page)
+        mockndex.get_user_network_summaries = MagicMock(side_effect=[second_page,
+                                                                     last_page])
+        loader.set_ndex_connection(mockndex)
+        loader._user = 'AAA BBB'
+
+        received_summaries = loader.get_network_summaries_from_ndex_server()
+        self.assertEqual(first_page + second_page + last_page,
+                         received_summaries)
+        mockndex.get_user_network_summaries.assert_has_calls([
+            mock.call('AAA BBB', offset=page_size, limit=page_size),
+            mock.call('AAA BBB', offset=2 * page_size, limit=page_size)])
+
     def test_0350_run(self):
         self._args.skipdownload = True
         loader = NDExSTRINGLoader(self._args)
@@ -1449,7 +1677,7 @@ class TestNdexstringloader(unittest.TestCase):
         loader._populate_display_names = MagicMock()
         loader._populate_aliases = MagicMock()
         loader._populate_represents = MagicMock()
-        loader.create_output_tsv_file = MagicMock()
+        loader.create_output_tsv_files = MagicMock()
 
         self.assertEqual(loader.run(), ndexloadstring.SUCCESS_CODE)
 
@@ -1459,8 +1687,8 @@ class TestNdexstringloader(unittest.TestCase):
         loader._download_string_files = MagicMock(return_value=ndexloadstring.ERROR_CODE)
         self.assertEqual(loader.run(), ndexloadstring.ERROR_CODE)
 
-        loader._download_string_files = MagicMock(return_value=ndexloadstring.SUCCESS_CODE)
-        loader._unpack_STRING_files = MagicMock(return_value=ndexloadstring.ERROR_CODE)
+        loader._check_if_data_dir_exists = MagicMock(return_value=True)
+        loader._unzip_local_string_files = MagicMock(return_value=ndexloadstring.ERROR_CODE)
         self.assertEqual(loader.run(), ndexloadstring.ERROR_CODE)
 
     def test_0360_get_template_from_server(self):
@@ -1537,9 +1765,9 @@ class TestNdexstringloader(unittest.TestCase):
         user_name = 'aaa'
         password = 'aaa'
         server = 'dev.ndexbio.org'
-        loader.__setattr__('_pass', password)
-        loader.__setattr__('_server', server)
-        loader.__setattr__('_user', user_name)
+        loader._pass = password
+        loader._server = server
+        loader._user = user_name
 
         loader.create_ndex_connection = MagicMock()
         loader.get_network_summaries_from_ndex_server = MagicMock(return_value=ndexloadstring.ERROR_CODE)
@@ -1613,7 +1841,8 @@ class TestNdexstringloader(unittest.TestCase):
         loader.prepare_cx = MagicMock()
         loader._load_network_to_server = MagicMock(return_value=ndexloadstring.SUCCESS_CODE)
         self.assertEqual({'Network 3': ndexloadstring.SUCCESS_CODE}, loader.load_to_ndex())
-        loader._load_network_to_server.assert_called_with(network_name)
+        loader._load_network_to_server.assert_called_with(network_name,
+                                                          cx_file=loader._get_output_cx_path(cutoffscore=0.7))
 
         # emulate getting style from local disk; we already emulated getting style from server above
         # with loader._template_UUID = 'e9a889d1-1b49-11e9-a05d-525400c25d22'
@@ -1622,6 +1851,29 @@ class TestNdexstringloader(unittest.TestCase):
         self.assertEqual({'Network 3': ndexloadstring.SUCCESS_CODE}, loader.load_to_ndex())
         loader._load_style_template.assert_called_with()
 
+    def test_0385_load_to_NDEx_multiple_cutoffs(self):
+        self._args['cutoffscore'] = [0.7, 0.4]
+        loader = NDExSTRINGLoader(self._args)
+        loader._update_UUID = None
+        loader._template_UUID = None
+        loader.create_ndex_connection = MagicMock()
+        loader.get_network_summaries_from_ndex_server = MagicMock(return_value=[])
+        loader._load_style_template = MagicMock()
+        loader.prepare_cx = MagicMock()
+        loader._load_network_to_server = MagicMock(side_effect=[ndexloadstring.SUCCESS_CODE,
+                                                                ndexloadstring.ERROR_CODE])
+
+        e_codes = loader.load_to_ndex()
+
+        name_07 = loader._get_network_name(cutoffscore=0.7)
+        name_04 = loader._get_network_name(cutoffscore=0.4)
+        self.assertEqual({name_07: ndexloadstring.SUCCESS_CODE,
+                          name_04: ndexloadstring.ERROR_CODE}, e_codes)
+        self.assertEqual([name_07, name_04], list(e_codes.keys()))
+        loader._load_network_to_server.assert_has_calls([
+            mock.call(name_07, cx_file=loader._get_output_cx_path(cutoffscore=0.7)),
+            mock.call(name_04, cx_file=loader._get_output_cx_path(cutoffscore=0.4))])
+
     def test_0390_main(self):
 
         loader = NDExSTRINGLoader(self._args)
@@ -1685,22 +1937,10 @@ class TestNdexstringloader(unittest.TestCase):
 
         loader._download_string_files()
 
-        full_file = loader.__getattribute__('_full_file_name') + '.gz'
-        names_file = loader.__getattribute__('_names_file') + '.gz'
-        entrez_file = loader.__getattribute__('_entrez_file') + '.gz'
-        uniprot_file = loader.__getattribute__('_uniprot_file') + '.gz'
-
-        self.assertTrue(os.path.exists(full_file))
-        self.assertTrue(os.path.exists(names_file))
-        self.assertTrue(os.path.exists(entrez_file))
-        self.assertTrue(os.path.exists(uniprot_file))
-
-        loader._unpack_STRING_files()
-
-        full_file = loader.__getattribute__('_full_file_name')
-        names_file = loader.__getattribute__('_names_file')
-        entrez_file = loader.__getattribute__('_entrez_file')
-        uniprot_file = loader.__getattribute__('_uniprot_file')
+        full_file = loader._full_file_name
+        names_file = loader._names_file
+        entrez_file = loader._entrez_file
+        uniprot_file = loader._uniprot_file
 
         self.assertTrue(os.path.exists(full_file))
         self.assertTrue(os.path.exists(names_file))
@@ -1714,12 +1954,12 @@ class TestNdexstringloader(unittest.TestCase):
         server = 'dev.ndexbio.org'
 
         loader = NDExSTRINGLoader(self._args)
-        loader.__setattr__('_user', user_name)
-        loader.__setattr__('_pass', password)
-        loader.__setattr__('_server', server)
+        loader._user = user_name
+        loader._pass = password
+        loader._server = server
 
         nice_cx_path = ndexloadstring.get_package_dir() + '/../tests/test_network.cx'
-        loader.__setattr__('_cx_network', nice_cx_path)
+        loader._cx_network = nice_cx_path
 
         # NDex client connection
         ndex_client = loader.create_ndex_connection()
@@ -1771,12 +2011,12 @@ class TestNdexstringloader(unittest.TestCase):
         self.assertEqual(count, 1)
 
         # try to get network UUID for a non-existant user; we expect to receive 2 from get_network_uuid()
-        loader.__setattr__('_user', '_no_exists_')
+        loader._user = '_no_exists_'
         ret_code = loader.get_network_uuid('test network')
         self.assertEqual(ret_code, 2)
 
         # try to create network for non-existant user; we expect to receive 2 from _load_or_update_network_on_server()
-        ndex_client.__setattr__('username', '_no_exists_')
+        ndex_client.username = '_no_exists_'
         ret_code = loader._load_or_update_network_on_server('test network')
         self.assertEqual(ret_code, 2)
 
@@ -1847,6 +2087,41 @@ class TestNdexstringloader(unittest.TestCase):
 
         loader._ndex.save_cx_stream_as_new_network.assert_not_called()
 
+    def test_write_node_id_annotated_cx(self):
+        temp_dir = tempfile.mkdtemp(dir=SCRATCH_DIR)
+        try:
+            net = NiceCXNetwork()
+            for x in range(4):
+                node_id = net.create_node('node' + str(x))
+                if x % 2:
+                    net.add_node_attribute(property_of=node_id, name='alias',
+                                           values=['a', 'b'],
+                                           type='list_of_string')
+            cx_file = os.path.join(temp_dir, 'foo.cx')
+            with open(cx_file, 'w') as f:
+                json.dump(net.to_cx(), f)
+
+            p = MagicMock()
+            p.datadir = temp_dir
+            p.stringversion = '12.0'
+            loader = NDExSTRINGLoader(p, py4cyto=MagicMock())
+
+            expected_file = os.path.join(temp_dir, 'expected.cx')
+            loader._ndexextra.add_node_id_as_node_attribute(cxfile=cx_file,
+                                                            outcxfile=expected_file)
+            network = ndex2.create_nice_cx_from_file(cx_file)
+            annotated_file = os.path.join(temp_dir, 'annotated.cx')
+            loader._write_node_id_annotated_cx(network, annotated_file)
+
+            with open(expected_file, 'r') as e, open(annotated_file, 'r') as a:
+                self.assertEqual(json.load(e), json.load(a))
+
+            # network itself is left without the node id attribute
+            self.assertEqual(ndex2.create_nice_cx_from_file(cx_file).to_cx(),
+                             network.to_cx())
+        finally:
+            shutil.rmtree(temp_dir)
+
     def test_apply_cytoscape_layout_ping_failed(self):
         p = MagicMock()
         p.datadir = '/foo'
@@ -1864,7 +2139,7 @@ class TestNdexstringloader(unittest.TestCase):
                              'to run layout: grid', str(e))
 
     def test_apply_cytoscape_layout_networks_not_in_dict(self):
-        temp_dir = tempfile.mkdtemp()
+        temp_dir = tempfile.mkdtemp(dir=SCRATCH_DIR)
         try:
             p = MagicMock()
             p.layout = 'grid'
@@ -1889,7 +2164,7 @@ class TestNdexstringloader(unittest.TestCase):
             shutil.rmtree(temp_dir)
 
     def test_apply_cytoscape_layout_networks_success(self):
-        temp_dir = tempfile.mkdtemp()
+        temp_dir = tempfile.mkdtemp(dir=SCRATCH_DIR)
         try:
             p = MagicMock()
             p.layout = 'grid'
@@ -1915,7 +2190,7 @@ class TestNdexstringloader(unittest.TestCase):
             shutil.rmtree(temp_dir)
 
     def test_prepare_cx_too_many_edges(self):
-        temp_dir = tempfile.mkdtemp()
+        temp_dir = tempfile.mkdtemp(dir=SCRATCH_DIR)
         try:
             p = MagicMock()
             p.layout = 'grid'
@@ -1935,7 +2210,7 @@ class TestNdexstringloader(unittest.TestCase):
             shutil.rmtree(temp_dir)
 
     def test_prepare_cx_spring_layout(self):
-        temp_dir = tempfile.mkdtemp()
+        temp_dir = tempfile.mkdtemp(dir=SCRATCH_DIR)
         try:
             p = MagicMock()
             p.layout = 'spring'
@@ -1969,7 +2244,7 @@ class TestNdexstringloader(unittest.TestCase):
             shutil.rmtree(temp_dir)
 
     def test_prepare_cx_default_cyto_layout(self):
-        temp_dir = tempfile.mkdtemp()
+        temp_dir = tempfile.mkdtemp(dir=SCRATCH_DIR)
         try:
             p = MagicMock()
             p.layout = '-'